@@ -9,8 +9,11 @@ class Settings(BaseSettings):
     DB_PATH: str = "./ocr_jobs.db"
     MAX_FILE_SIZE_MB: int = 50
     OLLAMA_URL: str = ""
+    OLLAMA_HTTP2: bool = False  # vLLM serves HTTP/2; Ollama itself does not
     OCR_BACKEND: str = "deepseek"  # "deepseek" (DeepSeek-OCR-2), "huggingface" (GLM-OCR), "ollama"
     OCR_MODE: str = "auto"  # "auto" (text+table two-pass), "text", "table"
+    OCR_SPECULATIVE_TABLE: bool = False  # huggingface auto mode: Table pass on every page, alongside Text
+    THREAD_POOL_SIZE: int = 0  # default executor size; 0 = max(32, NUM_WORKERS * 5)
 
     model_config = {"env_file": ".env", "env_file_encoding": "utf-8"}
 
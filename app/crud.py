@@ -1,12 +1,24 @@
+import hashlib
 import logging
-import uuid
-from datetime import datetime, timezone
-from typing import List, Optional, Tuple
-
-from sqlalchemy import delete, func, select, update
+from typing import AsyncIterator, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import (
+    Row,
+    case,
+    delete,
+    exists,
+    func,
+    insert,
+    literal_column,
+    select,
+    update,
+)
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
 
-from app.models import OcrJob, OcrPageJob
+from app.models import OcrBlob, OcrJob, OcrPageJob, new_id
+from app.ocr_backends.base import sniff_media_type
 
 logger = logging.getLogger(__name__)
 
@@ -18,7 +30,7 @@ async def create_job(
     total_pages: int,
 ) -> OcrJob:
     job = OcrJob(
-        id=str(uuid.uuid4()),
+        id=new_id(),
         original_filename=original_filename,
         file_type=file_type,
         total_pages=total_pages,
@@ -29,6 +41,24 @@ async def create_job(
     return job
 
 
+async def store_blob(
+    db: AsyncSession, data: bytes, media_type: Optional[str] = None
+) -> str:
+    """Store ``data`` under its SHA-256 hex digest, once per distinct content.
+
+    Without a ``media_type`` the type is sniffed from the image header.
+    """
+    sha = hashlib.sha256(data).hexdigest()
+    await db.execute(
+        sqlite_insert(OcrBlob)
+        .values(
+            sha=sha, data=data, media_type=media_type or sniff_media_type(data)
+        )
+        .on_conflict_do_nothing()
+    )
+    return sha
+
+
 async def create_page_job(
     db: AsyncSession,
     parent_job_id: Optional[str] = None,
@@ -36,16 +66,17 @@ async def create_page_job(
     image_data: bytes = b"",
     *,
     job_id: Optional[str] = None,
+    media_type: Optional[str] = None,
 ) -> OcrPageJob:
     # Accept both parent_job_id and job_id for compatibility
     actual_parent_id = parent_job_id or job_id
     if not actual_parent_id:
         raise ValueError("parent_job_id or job_id is required")
     page_job = OcrPageJob(
-        id=str(uuid.uuid4()),
+        id=new_id(),
         parent_job_id=actual_parent_id,
         page_number=page_number,
-        image_data=image_data,
+        image_sha=await store_blob(db, image_data, media_type),
         status="queued",
     )
     db.add(page_job)
@@ -53,6 +84,49 @@ async def create_page_job(
     return page_job
 
 
+async def create_page_jobs(
+    db: AsyncSession,
+    parent_job_id: str,
+    pages: Sequence[Tuple[int, bytes]],
+    media_type: Optional[str] = None,
+) -> List[str]:
+    """Insert (page_number, image_data) pages with one executemany per table.
+
+    Without a ``media_type`` each image's type is sniffed from its header.
+    Returns the new page job ids in input order.
+    """
+    blobs: Dict[str, bytes] = {}
+    page_rows = []
+    for page_number, image_data in pages:
+        sha = hashlib.sha256(image_data).hexdigest()
+        blobs.setdefault(sha, image_data)
+        page_rows.append(
+            {
+                "id": new_id(),
+                "parent_job_id": parent_job_id,
+                "page_number": page_number,
+                "image_sha": sha,
+                "status": "queued",
+            }
+        )
+    if not page_rows:
+        return []
+
+    await db.execute(
+        sqlite_insert(OcrBlob).on_conflict_do_nothing(),
+        [
+            {
+                "sha": sha,
+                "data": data,
+                "media_type": media_type or sniff_media_type(data),
+            }
+            for sha, data in blobs.items()
+        ],
+    )
+    await db.execute(insert(OcrPageJob), page_rows)
+    return [row["id"] for row in page_rows]
+
+
 async def get_job(db: AsyncSession, job_id: str) -> Optional[OcrJob]:
     result = await db.execute(select(OcrJob).where(OcrJob.id == job_id))
     return result.scalar_one_or_none()
@@ -67,33 +141,103 @@ async def get_page_jobs(db: AsyncSession, parent_job_id: str) -> List[OcrPageJob
     return list(result.scalars().all())
 
 
-async def get_next_queued_page(db: AsyncSession) -> Optional[OcrPageJob]:
-    """Get the next queued page job (does not claim it yet)."""
+async def get_page_status_counts(
+    db: AsyncSession, parent_job_id: str
+) -> Dict[str, int]:
+    """Number of page jobs in each status for a job, counted in SQL."""
+    result = await db.execute(
+        select(OcrPageJob.status, func.count())
+        .where(OcrPageJob.parent_job_id == parent_job_id)
+        .group_by(OcrPageJob.status)
+    )
+    return {status: count for status, count in result.all()}
+
+
+async def get_page_image(db: AsyncSession, page_job_id: str) -> Optional[bytes]:
     result = await db.execute(
-        select(OcrPageJob)
-        .where(OcrPageJob.status == "queued")
-        .order_by(OcrPageJob.created_at)
-        .limit(1)
+        select(OcrBlob.data)
+        .join(OcrPageJob, OcrPageJob.image_sha == OcrBlob.sha)
+        .where(OcrPageJob.id == page_job_id)
     )
     return result.scalar_one_or_none()
 
 
-async def claim_page_job(
-    db: AsyncSession, page_job_id: str, worker_id: str
-) -> bool:
-    """Atomically claim a page job. Returns True if successfully claimed."""
+async def get_page_image_info(
+    db: AsyncSession, parent_job_id: str, page_number: int
+) -> Optional[Row]:
+    """(rowid, media_type) of a page's image; rowid feeds stream_page_image."""
+    result = await db.execute(
+        select(
+            literal_column("ocr_blobs.rowid").label("rowid"),
+            OcrBlob.media_type,
+        )
+        .select_from(OcrBlob)
+        .join(OcrPageJob, OcrPageJob.image_sha == OcrBlob.sha)
+        .where(
+            OcrPageJob.parent_job_id == parent_job_id,
+            OcrPageJob.page_number == page_number,
+        )
+    )
+    return result.one_or_none()
+
+
+async def stream_page_image(
+    db: AsyncSession, rowid: int, chunk_size: int = 1 << 20
+) -> AsyncIterator[bytes]:
+    """Yield a page image in chunks through an incremental BLOB handle.
+
+    Reads go through sqlite3's blobopen on the session's own aiosqlite
+    thread, so the image is never materialized as one bytes object. Used as
+    a StreamingResponse body, this needs the request's session to stay open
+    until the body is sent, which FastAPI does from 0.118 on.
+    """
+    conn = await db.connection()
+    raw = await conn.get_raw_connection()
+    aio_conn = raw.driver_connection
+    blob = await aio_conn._execute(
+        aio_conn._conn.blobopen,
+        OcrBlob.__tablename__,
+        "data",
+        rowid,
+        readonly=True,
+    )
+    try:
+        while chunk := await aio_conn._execute(blob.read, chunk_size):
+            yield chunk
+    finally:
+        await aio_conn._execute(blob.close)
+
+
+async def claim_next_queued_page(
+    db: AsyncSession, worker_id: str
+) -> Optional[Row]:
+    """Claim the oldest queued page job in a single UPDATE.
+
+    Returns an (id, page_number, parent_job_id) row, or None if the queue is
+    empty. The status check in the WHERE clause keeps the claim atomic when
+    several workers race for the same row.
+    """
+    queued = aliased(OcrPageJob)
+    next_id = (
+        select(queued.id)
+        .where(queued.status == "queued")
+        .order_by(queued.created_at)
+        .limit(1)
+        .scalar_subquery()
+    )
     result = await db.execute(
         update(OcrPageJob)
-        .where(OcrPageJob.id == page_job_id, OcrPageJob.status == "queued")
+        .where(OcrPageJob.id == next_id, OcrPageJob.status == "queued")
         .values(
             status="processing",
             worker_id=worker_id,
-            updated_at=datetime.now(timezone.utc),
+            updated_at=func.now(),
+        )
+        .returning(
+            OcrPageJob.id, OcrPageJob.page_number, OcrPageJob.parent_job_id
         )
-        .returning(OcrPageJob.id)
     )
-    await db.flush()
-    return result.scalar_one_or_none() is not None
+    return result.one_or_none()
 
 
 async def update_page_job_result(
@@ -110,43 +254,68 @@ async def update_page_job_result(
             markdown_text=markdown_text,
             status=status,
             error_message=error_message,
-            updated_at=datetime.now(timezone.utc),
+            updated_at=func.now(),
         )
     )
-    await db.flush()
 
 
-async def update_job_status(db: AsyncSession, job_id: str, status: str) -> None:
-    await db.execute(
-        update(OcrJob)
-        .where(OcrJob.id == job_id)
-        .values(status=status, updated_at=datetime.now(timezone.utc))
+def _has_pages_in(parent_job_id: str, *statuses: str):
+    # IN over the (parent_job_id, status) index: one seek per status.
+    return exists().where(
+        OcrPageJob.parent_job_id == parent_job_id,
+        OcrPageJob.status.in_(statuses),
     )
-    await db.flush()
 
 
 async def check_and_update_parent_status(
     db: AsyncSession, parent_job_id: str
 ) -> None:
-    """Check all page jobs for a parent and update parent status if all done."""
-    result = await db.execute(
-        select(OcrPageJob.status).where(
-            OcrPageJob.parent_job_id == parent_job_id
+    """Roll page statuses up into the parent job in a single UPDATE.
+
+    completed when every page completed; failed when every page finished
+    and some failed; processing while any page is processing; otherwise
+    the status is left as is.
+    """
+    await db.execute(
+        update(OcrJob)
+        .where(
+            OcrJob.id == parent_job_id,
+            exists().where(OcrPageJob.parent_job_id == parent_job_id),
+        )
+        .values(
+            status=case(
+                (
+                    ~_has_pages_in(
+                        parent_job_id, "queued", "processing", "failed"
+                    ),
+                    "completed",
+                ),
+                (~_has_pages_in(parent_job_id, "queued", "processing"), "failed"),
+                (_has_pages_in(parent_job_id, "processing"), "processing"),
+                else_=OcrJob.status,
+            ),
+            updated_at=func.now(),
         )
     )
-    statuses = [row[0] for row in result.fetchall()]
 
-    if not statuses:
-        return
 
-    if all(s == "completed" for s in statuses):
-        await update_job_status(db, parent_job_id, "completed")
-    elif any(s == "failed" for s in statuses) and all(
-        s in ("completed", "failed") for s in statuses
-    ):
-        await update_job_status(db, parent_job_id, "failed")
-    elif any(s == "processing" for s in statuses):
-        await update_job_status(db, parent_job_id, "processing")
+async def finalize_page_job(
+    db: AsyncSession,
+    page_job_id: str,
+    parent_job_id: str,
+    markdown_text: Optional[str],
+    status: str,
+    error_message: Optional[str] = None,
+) -> None:
+    """Record a page result and roll the parent status up in one batch.
+
+    The caller commits; all statements share that single transaction.
+    """
+    await update_page_job_result(
+        db, page_job_id, markdown_text, status, error_message
+    )
+    await check_and_update_parent_status(db, parent_job_id)
+    await db.flush()
 
 
 async def list_jobs(
@@ -156,15 +325,27 @@ async def list_jobs(
     page_size: int = 20,
     *,
     status: Optional[str] = None,
-) -> Tuple[List[OcrJob], int]:
+) -> Tuple[List[Row], int]:
+    """Return one page of job summary rows plus the total matching count.
+
+    Only scalar columns are selected; the total comes from a window function
+    so a page with results needs a single query.
+    """
     # Accept both status_filter and status for compatibility
     effective_status = status_filter or status
-    query = select(OcrJob)
-    count_query = select(func.count(OcrJob.id))
+    query = select(
+        OcrJob.id.label("job_id"),
+        OcrJob.original_filename,
+        OcrJob.file_type,
+        OcrJob.total_pages,
+        OcrJob.status,
+        OcrJob.created_at,
+        OcrJob.updated_at,
+        func.count().over().label("total"),
+    )
 
     if effective_status:
         query = query.where(OcrJob.status == effective_status)
-        count_query = count_query.where(OcrJob.status == effective_status)
 
     query = (
         query.order_by(OcrJob.created_at.desc())
@@ -173,14 +354,37 @@ async def list_jobs(
     )
 
     result = await db.execute(query)
-    count_result = await db.execute(count_query)
+    jobs = list(result.all())
+    if jobs:
+        return jobs, jobs[0].total
+    if page == 1:
+        return jobs, 0
 
-    jobs = list(result.scalars().all())
-    total = count_result.scalar_one()
-    return jobs, total
+    # Past the last page there is no row to carry the window count.
+    count_query = select(func.count(OcrJob.id))
+    if effective_status:
+        count_query = count_query.where(OcrJob.status == effective_status)
+    count_result = await db.execute(count_query)
+    return jobs, count_result.scalar_one()
 
 
 async def delete_job(db: AsyncSession, job_id: str) -> bool:
+    # SQLite does not enforce ON DELETE CASCADE unless foreign keys are
+    # enabled, so remove the page rows explicitly.
+    page_result = await db.execute(
+        delete(OcrPageJob)
+        .where(OcrPageJob.parent_job_id == job_id)
+        .returning(OcrPageJob.image_sha)
+    )
+    shas = {sha for sha in page_result.scalars() if sha is not None}
+    if shas:
+        # Drop the job's images unless another page still shares them.
+        await db.execute(
+            delete(OcrBlob).where(
+                OcrBlob.sha.in_(shas),
+                ~exists().where(OcrPageJob.image_sha == OcrBlob.sha),
+            )
+        )
     result = await db.execute(
         delete(OcrJob).where(OcrJob.id == job_id).returning(OcrJob.id)
     )
@@ -1,19 +1,59 @@
+import hashlib
 import logging
 
+from sqlalchemy import event, inspect
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 from app.config import get_settings
-from app.models import Base
+from app.models import Base, OcrPageJob
+from app.ocr_backends.base import sniff_media_type
 
 logger = logging.getLogger(__name__)
 
+# Applied to every new DBAPI connection. WAL lets the API read while a worker
+# writes; synchronous=NORMAL is crash-safe under WAL without an fsync per commit.
+SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-64000",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA busy_timeout=5000",
+)
+
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    cursor = dbapi_connection.cursor()
+    try:
+        for pragma in SQLITE_PRAGMAS:
+            cursor.execute(pragma)
+    finally:
+        cursor.close()
+
 
 def get_engine():
     settings = get_settings()
     db_url = f"sqlite+aiosqlite:///{settings.DB_PATH}"
-    return create_async_engine(
-        db_url, echo=False, connect_args={"check_same_thread": False}
+    pool_kwargs = {}
+    if settings.DB_PATH != ":memory:":
+        # Keep one connection per worker plus headroom for API requests, so
+        # sessions reuse open aiosqlite connections instead of reconnecting.
+        pool_kwargs = {
+            "poolclass": AsyncAdaptedQueuePool,
+            "pool_size": settings.NUM_WORKERS + 4,
+            "max_overflow": 8,
+            "pool_pre_ping": False,
+            "pool_recycle": -1,
+        }
+    engine = create_async_engine(
+        db_url,
+        echo=False,
+        connect_args={"check_same_thread": False},
+        **pool_kwargs,
     )
+    event.listen(engine.sync_engine, "connect", _apply_sqlite_pragmas)
+    return engine
 
 
 engine = get_engine()
@@ -22,9 +62,133 @@ AsyncSessionLocal = async_sessionmaker(
 )
 
 
+def _add_missing_columns(sync_conn) -> None:
+    # create_all does not alter existing tables, so nullable columns added to
+    # the models later are added here for databases from older versions.
+    inspector = inspect(sync_conn)
+    for table in Base.metadata.sorted_tables:
+        existing = {col["name"] for col in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing or not column.nullable:
+                continue
+            col_type = column.type.compile(dialect=sync_conn.dialect)
+            sync_conn.exec_driver_sql(
+                f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {col_type}'
+            )
+
+
+# Rows hashed per round trip while moving old inline page images into
+# ocr_blobs, so an upgrade never holds more than a batch of images in memory.
+_MIGRATE_BATCH = 64
+
+
+def _move_image_to_blob(sync_conn, page_job_id: str, data: bytes) -> None:
+    sha = hashlib.sha256(data).hexdigest()
+    sync_conn.exec_driver_sql(
+        "INSERT OR IGNORE INTO ocr_blobs (sha, data, media_type) "
+        "VALUES (?, ?, ?)",
+        (sha, data, sniff_media_type(data)),
+    )
+    sync_conn.exec_driver_sql(
+        "UPDATE ocr_page_jobs SET image_sha = ? WHERE id = ?",
+        (sha, page_job_id),
+    )
+
+
+def _migrate_sidecar_page_images(sync_conn) -> None:
+    # Some databases keep page images in an ocr_page_images table keyed by
+    # page job. Move them into ocr_blobs the same way, then drop the table.
+    if not inspect(sync_conn).has_table("ocr_page_images"):
+        return
+
+    logger.info("Migrating page images from ocr_page_images to ocr_blobs")
+    while True:
+        rows = sync_conn.exec_driver_sql(
+            "SELECT page_job_id, image_data FROM ocr_page_images LIMIT ?",
+            (_MIGRATE_BATCH,),
+        ).all()
+        if not rows:
+            break
+        for page_job_id, data in rows:
+            _move_image_to_blob(sync_conn, page_job_id, data)
+            sync_conn.exec_driver_sql(
+                "DELETE FROM ocr_page_images WHERE page_job_id = ?",
+                (page_job_id,),
+            )
+    sync_conn.exec_driver_sql("DROP TABLE ocr_page_images")
+
+
+def _fill_missing_media_types(sync_conn) -> None:
+    # Blobs stored before media types were recorded: read the type from the
+    # image header so the image endpoint never has to guess.
+    rows = sync_conn.exec_driver_sql(
+        "SELECT sha, substr(data, 1, 16) FROM ocr_blobs "
+        "WHERE media_type IS NULL"
+    ).all()
+    for sha, header in rows:
+        sync_conn.exec_driver_sql(
+            "UPDATE ocr_blobs SET media_type = ? WHERE sha = ?",
+            (sniff_media_type(header), sha),
+        )
+
+
+def _migrate_inline_page_images(sync_conn) -> None:
+    # Databases from before the blob table keep each page image in
+    # ocr_page_jobs.image_data (NOT NULL). Move the bytes into ocr_blobs,
+    # point image_sha at them, then rebuild the table without the column.
+    columns = {
+        col["name"] for col in inspect(sync_conn).get_columns("ocr_page_jobs")
+    }
+    if "image_data" not in columns:
+        return
+
+    logger.info("Migrating page images from ocr_page_jobs to ocr_blobs")
+    while True:
+        rows = sync_conn.exec_driver_sql(
+            "SELECT id, image_data FROM ocr_page_jobs "
+            "WHERE image_sha IS NULL LIMIT ?",
+            (_MIGRATE_BATCH,),
+        ).all()
+        if not rows:
+            break
+        for page_job_id, data in rows:
+            _move_image_to_blob(sync_conn, page_job_id, data)
+
+    # SQLite cannot drop a NOT NULL column in place on older versions, so
+    # copy the rows into a fresh table built from the model.
+    sync_conn.exec_driver_sql(
+        "ALTER TABLE ocr_page_jobs RENAME TO _ocr_page_jobs_old"
+    )
+    for index in inspect(sync_conn).get_indexes("_ocr_page_jobs_old"):
+        sync_conn.exec_driver_sql(f'DROP INDEX "{index["name"]}"')
+    OcrPageJob.__table__.create(sync_conn)
+    kept = ", ".join(
+        f'"{col.name}"' for col in OcrPageJob.__table__.columns
+        if col.name in columns
+    )
+    sync_conn.exec_driver_sql(
+        f"INSERT INTO ocr_page_jobs ({kept}) "
+        f"SELECT {kept} FROM _ocr_page_jobs_old"
+    )
+    sync_conn.exec_driver_sql("DROP TABLE _ocr_page_jobs_old")
+
+
+def _create_missing_indexes(sync_conn) -> None:
+    # create_all skips tables that already exist, so indexes added to the
+    # models later are created here for databases from older versions.
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(sync_conn, checkfirst=True)
+
+
 async def init_db() -> None:
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(_add_missing_columns)
+        await conn.run_sync(_migrate_sidecar_page_images)
+        await conn.run_sync(_migrate_inline_page_images)
+        await conn.run_sync(_fill_missing_media_types)
+        await conn.run_sync(_create_missing_indexes)
     logger.info("Database initialized")
 
 
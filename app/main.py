@@ -1,4 +1,6 @@
+import asyncio
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI, Request
@@ -20,9 +22,16 @@ async def lifespan(app: FastAPI):
     )
     logger.info("Starting GLM-OCR Worker Service")
 
+    settings = get_settings()
+    # Blocking work offloaded with asyncio.to_thread is I/O bound, so size
+    # the default executor to the workers rather than the CPU count.
+    pool_size = settings.THREAD_POOL_SIZE or max(32, settings.NUM_WORKERS * 5)
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="ocr-io")
+    )
+
     await init_db()
 
-    settings = get_settings()
     try:
         from app.worker import worker_manager
 
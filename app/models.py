@@ -2,10 +2,23 @@ import uuid
 from datetime import datetime, timezone
 from typing import Optional, List
 
-from sqlalchemy import String, Integer, LargeBinary, ForeignKey, DateTime
+from sqlalchemy import (
+    String,
+    Integer,
+    LargeBinary,
+    ForeignKey,
+    DateTime,
+    Index,
+    func,
+    text,
+)
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 
 
+def new_id() -> str:
+    return uuid.uuid4().hex
+
+
 def utcnow():
     return datetime.now(timezone.utc)
 
@@ -16,9 +29,15 @@ class Base(DeclarativeBase):
 
 class OcrJob(Base):
     __tablename__ = "ocr_jobs"
+    __table_args__ = (
+        Index("ix_jobs_status_created", "status", "created_at"),
+    )
 
     id: Mapped[str] = mapped_column(
-        String, primary_key=True, default=lambda: str(uuid.uuid4())
+        String(32),
+        primary_key=True,
+        default=new_id,
+        server_default=text("(lower(hex(randomblob(16))))"),
     )
     original_filename: Mapped[str] = mapped_column(String, nullable=False)
     file_type: Mapped[str] = mapped_column(String, nullable=False)  # "pdf" or "image"
@@ -30,11 +49,17 @@ class OcrJob(Base):
         DateTime(timezone=True), default=utcnow
     )
     updated_at: Mapped[datetime] = mapped_column(
-        DateTime(timezone=True), default=utcnow, onupdate=utcnow
+        DateTime(timezone=True),
+        default=utcnow,
+        server_default=func.now(),
+        onupdate=func.now(),
     )
 
     pages: Mapped[List["OcrPageJob"]] = relationship(
-        "OcrPageJob", back_populates="parent_job", cascade="all, delete-orphan"
+        "OcrPageJob",
+        back_populates="parent_job",
+        cascade="all, delete-orphan",
+        lazy="raise",
     )
 
     @property
@@ -44,9 +69,17 @@ class OcrJob(Base):
 
 class OcrPageJob(Base):
     __tablename__ = "ocr_page_jobs"
+    __table_args__ = (
+        Index("ix_page_jobs_status_created", "status", "created_at"),
+        Index("ix_page_jobs_parent_status", "parent_job_id", "status"),
+        Index("ix_page_jobs_image_sha", "image_sha"),
+    )
 
     id: Mapped[str] = mapped_column(
-        String, primary_key=True, default=lambda: str(uuid.uuid4())
+        String(32),
+        primary_key=True,
+        default=new_id,
+        server_default=text("(lower(hex(randomblob(16))))"),
     )
     parent_job_id: Mapped[str] = mapped_column(
         String,
@@ -54,7 +87,9 @@ class OcrPageJob(Base):
         nullable=False,
     )
     page_number: Mapped[int] = mapped_column(Integer, nullable=False)
-    image_data: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+    image_sha: Mapped[Optional[str]] = mapped_column(
+        String(64), ForeignKey("ocr_blobs.sha"), nullable=True
+    )
     markdown_text: Mapped[Optional[str]] = mapped_column(String, nullable=True)
     status: Mapped[str] = mapped_column(String, default="queued")
     worker_id: Mapped[Optional[str]] = mapped_column(String, nullable=True)
@@ -63,7 +98,21 @@ class OcrPageJob(Base):
         DateTime(timezone=True), default=utcnow
     )
     updated_at: Mapped[datetime] = mapped_column(
-        DateTime(timezone=True), default=utcnow, onupdate=utcnow
+        DateTime(timezone=True),
+        default=utcnow,
+        server_default=func.now(),
+        onupdate=func.now(),
     )
 
     parent_job: Mapped["OcrJob"] = relationship("OcrJob", back_populates="pages")
+
+
+# Page image bytes live in their own table so status updates and queue scans
+# on ocr_page_jobs never rewrite or read the blob pages. Rows are keyed by the
+# SHA-256 of the image, so identical pages are stored once and shared.
+class OcrBlob(Base):
+    __tablename__ = "ocr_blobs"
+
+    sha: Mapped[str] = mapped_column(String(64), primary_key=True)
+    data: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+    media_type: Mapped[Optional[str]] = mapped_column(String, nullable=True)
@@ -1,19 +1,80 @@
+import hashlib
 from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Optional
+
+# Leading magic bytes of the image formats the service accepts.
+_IMAGE_SIGNATURES = (
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"II*\x00", "image/tiff"),
+    (b"MM\x00*", "image/tiff"),
+    (b"BM", "image/bmp"),
+)
+
+
+def sniff_media_type(
+    image_bytes: bytes, default: Optional[str] = "image/png"
+) -> Optional[str]:
+    """Return the MIME type of image bytes from their header, or ``default``."""
+    for signature, media_type in _IMAGE_SIGNATURES:
+        if image_bytes.startswith(signature):
+            return media_type
+    if image_bytes[:4] == b"RIFF" and image_bytes[8:12] == b"WEBP":
+        return "image/webp"
+    return default
+
+
+_RESULT_CACHE_SIZE = 1024
+
+
+class UncachedResult(str):
+    """An OCR result that process_image returns but does not cache.
+
+    Backends return one for degraded output, such as text kept after a
+    failed pass, so the next attempt on the same image runs the model again.
+    """
 
 
 class OCRBackend(ABC):
     """Abstract base class for OCR backends.
 
-    All backends must implement process_image which takes raw PNG/image bytes
-    and returns the extracted text as a markdown string.
+    All backends must implement _process_image_impl which takes raw image
+    bytes (JPEG for rendered PDF pages, uploads as sent) and returns the
+    extracted text as a markdown string. process_image wraps it with an
+    LRU of results keyed by the SHA-256 of the image, the same key the blob
+    store uses, so duplicate pages skip the model.
     """
 
-    @abstractmethod
+    def __init__(self) -> None:
+        self._ocr_results: OrderedDict[str, str] = OrderedDict()
+
     async def process_image(self, image_bytes: bytes) -> str:
         """Process an image and return OCR result as markdown text.
 
+        Raises:
+            OCRProcessingError: If OCR fails after retries
+        """
+        key = hashlib.sha256(image_bytes).hexdigest()
+        cached = self._ocr_results.get(key)
+        if cached is not None:
+            self._ocr_results.move_to_end(key)
+            return cached
+
+        result = await self._process_image_impl(image_bytes)
+        if isinstance(result, UncachedResult):
+            return str(result)
+        self._ocr_results[key] = result
+        if len(self._ocr_results) > _RESULT_CACHE_SIZE:
+            self._ocr_results.popitem(last=False)
+        return result
+
+    @abstractmethod
+    async def _process_image_impl(self, image_bytes: bytes) -> str:
+        """Process an image and return OCR result as markdown text.
+
         Args:
-            image_bytes: Raw image bytes (PNG format preferred)
+            image_bytes: Raw image bytes (PNG or JPEG preferred)
 
         Returns:
             Markdown-formatted OCR result string
@@ -23,6 +84,9 @@ class OCRBackend(ABC):
         """
         ...
 
+    async def aclose(self) -> None:
+        """Release resources held by the backend (thread pools, clients)."""
+
 
 class OCRProcessingError(Exception):
     """Raised when OCR processing fails."""
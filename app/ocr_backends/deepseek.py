@@ -1,15 +1,26 @@
 import asyncio
 import logging
+from concurrent.futures import ThreadPoolExecutor
 import re
-import tempfile
 import os
 
 from gradio_client import Client, handle_file
 
 from app.ocr_backends.base import OCRBackend, OCRProcessingError
+from app.ocr_backends.spaces import (
+    get_space_client,
+    reset_space_clients,
+    stage_image,
+)
 
 logger = logging.getLogger(__name__)
 
+# DeepSeek escapes currency as inline LaTeX; each alternative becomes "$":
+#   \( or \) followed by digit, comma, or dot → currency $ sign
+#   \) before an HTML tag, e.g. "15,700/mo (Staging)\)" → "$15,700/mo (Staging)"
+#   (the \) closes a fake LaTeX that started with \( elsewhere)
+_LATEX_DOLLAR_RE = re.compile(r"\\(?:\((?=[\d,.])|\)(?=[\d,.]|\s*<))")
+
 
 class DeepSeekBackend(OCRBackend):
     """DeepSeek-OCR-2 backend via HuggingFace Space.
@@ -21,27 +32,35 @@ class DeepSeekBackend(OCRBackend):
     Modes: Default, Quality, Fast, No Crop, Small
     """
 
-    def __init__(self, hf_token: str, mode: str = "auto"):
+    def __init__(
+        self, hf_token: str, mode: str = "auto", max_workers: int = 1
+    ):
+        super().__init__()
         self._hf_token = hf_token
         self._mode = mode  # auto, text, table
-        self._client = None
+        # Dedicated pool for the blocking gradio calls, kept apart from the
+        # default executor that FastAPI and asyncio.to_thread share.
+        self._pool = ThreadPoolExecutor(
+            max_workers=max(1, max_workers), thread_name_prefix="ocr"
+        )
 
     def _get_client(self) -> Client:
-        if self._client is None:
-            self._client = Client(
-                "prithivMLmods/DeepSeek-OCR-2-Demo", token=self._hf_token
-            )
-        return self._client
+        return get_space_client(
+            "prithivMLmods/DeepSeek-OCR-2-Demo", self._hf_token
+        )
+
+    async def aclose(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
 
-    async def _call_ocr(self, tmp_path: str, task: str = "Markdown") -> str:
+    async def _call_ocr(self, image: dict, task: str = "Markdown") -> str:
         """Call DeepSeek-OCR-2 with a specific task."""
         client = self._get_client()
-        loop = asyncio.get_event_loop()
+        loop = asyncio.get_running_loop()
         # Returns: (raw_text, markdown, token_info, image, gallery)
         result = await loop.run_in_executor(
-            None,
+            self._pool,
             lambda: client.predict(
-                image=handle_file(tmp_path),
+                image=image,
                 mode="Default",
                 task=task,
                 custom_prompt="",
@@ -61,57 +80,40 @@ class DeepSeekBackend(OCRBackend):
         Preserve real LaTeX like \(x^2 + y^2\) which has paired delimiters
         with math operators inside.
         """
-        import re
-
-        # \( followed by digit, comma, or dot → currency $ sign
-        text = re.sub(r"\\\((?=[\d,.])", "$", text)
-
-        # \) followed by digit, comma, or dot → currency $ sign
-        text = re.sub(r"\\\)(?=[\d,.])", "$", text)
-
-        # \) at end of content that looks like currency
-        # e.g. "15,700/mo (Staging)\)" → "$15,700/mo (Staging)"
-        # The \) here closes a fake LaTeX that started with \( elsewhere
-        text = re.sub(r"\\\)(?=\s*<)", "$", text)
-
-        return text
+        if "\\(" not in text and "\\)" not in text:
+            return text
+        return _LATEX_DOLLAR_RE.sub("$", text)
 
-    async def process_image(self, image_bytes: bytes) -> str:
+    async def _process_image_impl(self, image_bytes: bytes) -> str:
         """OCR with configurable mode.
 
         DeepSeek-OCR-2 'Markdown' task already outputs well-structured
         markdown with HTML tables (including rowspan/colspan) when needed.
         No two-pass required — single pass handles all content types.
         """
-        tmp_path = None
+        tmp_path = stage_image(image_bytes)
+        image = handle_file(tmp_path)
         last_error = None
 
-        for attempt in range(3):
-            try:
-                tmp = tempfile.NamedTemporaryFile(
-                    suffix=".png", delete=False
-                )
-                tmp_path = tmp.name
-                tmp.write(image_bytes)
-                tmp.close()
-
-                result = await self._call_ocr(tmp_path, "Markdown")
-                result = self._fix_latex_dollars(result)
-                return result
-
-            except Exception as e:
-                last_error = e
-                backoff = 2**attempt
-                logger.warning(
-                    f"DeepSeek OCR attempt {attempt + 1}/3 failed: {e}, "
-                    f"retrying in {backoff}s"
-                )
-                if attempt < 2:
-                    self._client = None
-                    await asyncio.sleep(backoff)
-            finally:
-                if tmp_path and os.path.exists(tmp_path):
-                    os.unlink(tmp_path)
+        try:
+            for attempt in range(3):
+                try:
+                    result = await self._call_ocr(image, "Markdown")
+                    result = self._fix_latex_dollars(result)
+                    return result
+
+                except Exception as e:
+                    last_error = e
+                    backoff = 2**attempt
+                    logger.warning(
+                        f"DeepSeek OCR attempt {attempt + 1}/3 failed: {e}, "
+                        f"retrying in {backoff}s"
+                    )
+                    if attempt < 2:
+                        reset_space_clients()
+                        await asyncio.sleep(backoff)
+        finally:
+            os.unlink(tmp_path)
 
         raise OCRProcessingError(
             f"DeepSeek OCR failed after 3 attempts: {last_error}"
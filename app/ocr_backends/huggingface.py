@@ -1,14 +1,30 @@
 import asyncio
 import logging
-import tempfile
+import re
+from concurrent.futures import ThreadPoolExecutor
 import os
 
 from gradio_client import Client, handle_file
 
-from app.ocr_backends.base import OCRBackend, OCRProcessingError
+from app.ocr_backends.base import (
+    OCRBackend,
+    OCRProcessingError,
+    UncachedResult,
+)
+from app.ocr_backends.spaces import (
+    get_space_client,
+    reset_space_clients,
+    stage_image,
+)
 
 logger = logging.getLogger(__name__)
 
+# Two consecutive pipe-delimited lines: a markdown table, not a stray "|"
+# in code or prose.
+_TABLE_ROWS_RE = re.compile(
+    r"^[ \t]*\|.*\|[ \t]*\n[ \t]*\|.*\|[ \t]*$", re.MULTILINE
+)
+
 
 class HuggingFaceBackend(OCRBackend):
     """GLM-OCR backend via HuggingFace Space (prithivMLmods/GLM-OCR-Demo).
@@ -22,99 +38,122 @@ class HuggingFaceBackend(OCRBackend):
         table — Table mode only (HTML output)
     """
 
-    def __init__(self, hf_token: str, mode: str = "auto"):
+    def __init__(
+        self,
+        hf_token: str,
+        mode: str = "auto",
+        max_workers: int = 1,
+        speculative_table: bool = False,
+    ):
+        super().__init__()
         self._hf_token = hf_token
         self._mode = mode
-        self._client = None
+        self._speculative_table = speculative_table
+        # Dedicated pool for the blocking gradio calls, kept apart from the
+        # default executor that FastAPI and asyncio.to_thread share.
+        self._pool = ThreadPoolExecutor(
+            max_workers=max(1, max_workers), thread_name_prefix="ocr"
+        )
 
     def _get_client(self) -> Client:
-        if self._client is None:
-            self._client = Client(
-                "prithivMLmods/GLM-OCR-Demo", token=self._hf_token
-            )
-        return self._client
+        return get_space_client("prithivMLmods/GLM-OCR-Demo", self._hf_token)
 
-    async def _call_ocr(self, tmp_path: str, task: str) -> str:
+    async def aclose(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    async def _call_ocr(self, image: dict, task: str) -> str:
         """Call GLM-OCR with a specific task mode."""
         client = self._get_client()
-        loop = asyncio.get_event_loop()
+        loop = asyncio.get_running_loop()
         raw_output, rendered_md = await loop.run_in_executor(
-            None,
+            self._pool,
             lambda: client.predict(
-                image=handle_file(tmp_path),
+                image=image,
                 task=task,
                 api_name="/process_image",
             ),
         )
         return str(raw_output)
 
-    async def process_image(self, image_bytes: bytes) -> str:
+    async def _process_image_impl(self, image_bytes: bytes) -> str:
         """OCR with configurable mode.
 
-        auto:  Two-pass — Text for markdown, Table for HTML with
-               rowspan/colspan. Both appended in output.
+        auto:  Two-pass — Text for markdown, then Table for HTML with
+               rowspan/colspan only when the text contains a table. With
+               speculative_table both passes run concurrently on every
+               page and the Table output is kept only for table pages.
         text:  Single pass — markdown only.
         table: Single pass — HTML table output only.
         """
-        tmp_path = None
+        tmp_path = stage_image(image_bytes)
+        image = handle_file(tmp_path)
         last_error = None
-
-        for attempt in range(3):
-            try:
-                tmp = tempfile.NamedTemporaryFile(
-                    suffix=".png", delete=False
-                )
-                tmp_path = tmp.name
-                tmp.write(image_bytes)
-                tmp.close()
-
-                if self._mode == "table":
-                    return await self._call_ocr(tmp_path, "Table")
-
-                if self._mode == "text":
-                    return await self._call_ocr(tmp_path, "Text")
-
-                # Auto mode: two-pass
-                # Pass 1: Text mode
-                text_result = await self._call_ocr(tmp_path, "Text")
-
-                # Pass 2: Table mode — only if tables detected
-                has_table = (
-                    "|" in text_result
-                    and ("---" in text_result or "| :" in text_result)
-                )
-
-                if has_table:
-                    try:
-                        table_html = await self._call_ocr(tmp_path, "Table")
-                    except Exception as e:
+        # Passes that succeeded, so a retry only repeats the ones that failed.
+        passes: dict[str, str] = {}
+
+        async def run_pass(task: str) -> str:
+            if task not in passes:
+                passes[task] = await self._call_ocr(image, task)
+            return passes[task]
+
+        try:
+            for attempt in range(3):
+                try:
+                    if self._mode == "table":
+                        return await run_pass("Table")
+
+                    if self._mode == "text":
+                        return await run_pass("Text")
+
+                    if self._speculative_table:
+                        # Both passes at once, so a table page costs
+                        # max(text, table) rather than text + table, at
+                        # the price of a Table call on every page.
+                        text_result, table_result = await asyncio.gather(
+                            run_pass("Text"),
+                            run_pass("Table"),
+                            return_exceptions=True,
+                        )
+                        if isinstance(text_result, BaseException):
+                            raise text_result
+                        if _TABLE_ROWS_RE.search(text_result) is None:
+                            return text_result
+                    else:
+                        # Pass 1: Text; pass 2: Table only if tables detected
+                        text_result = await run_pass("Text")
+                        if _TABLE_ROWS_RE.search(text_result) is None:
+                            return text_result
+                        try:
+                            table_result = await run_pass("Table")
+                        except Exception as e:
+                            table_result = e
+
+                    if isinstance(table_result, BaseException):
                         logger.warning(
-                            f"Table pass failed, using text only: {e}"
+                            "Table pass failed, using text only: "
+                            f"{table_result}"
                         )
-                        table_html = None
-
-                    if table_html and "<table" in table_html:
+                        return UncachedResult(text_result)
+                    if "<table" in table_result:
                         return (
                             text_result
                             + "\n\n<!-- HTML tables with rowspan/colspan -->\n"
-                            + table_html
+                            + table_result
                         )
-
-                return text_result
-
-            except Exception as e:
-                last_error = e
-                backoff = 2**attempt
-                logger.warning(
-                    f"OCR attempt {attempt + 1}/3 failed: {e}, "
-                    f"retrying in {backoff}s"
-                )
-                if attempt < 2:
-                    self._client = None
-                    await asyncio.sleep(backoff)
-            finally:
-                if tmp_path and os.path.exists(tmp_path):
-                    os.unlink(tmp_path)
+                    return text_result
+
+                except Exception as e:
+                    last_error = e
+                    backoff = 2**attempt
+                    logger.warning(
+                        f"OCR attempt {attempt + 1}/3 failed: {e}, "
+                        f"retrying in {backoff}s"
+                    )
+                    if attempt < 2:
+                        reset_space_clients()
+                        await asyncio.sleep(backoff)
+        finally:
+            os.unlink(tmp_path)
 
         raise OCRProcessingError(
             f"OCR failed after 3 attempts: {last_error}"
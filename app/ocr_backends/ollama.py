@@ -1,13 +1,23 @@
+import asyncio
 import base64
 import logging
+from typing import Optional
 
 import httpx
 
-from app.ocr_backends.base import OCRBackend, OCRProcessingError
+from app.ocr_backends.base import (
+    OCRBackend,
+    OCRProcessingError,
+    sniff_media_type,
+)
 
 logger = logging.getLogger(__name__)
 
 
+def _b64encode_str(data: bytes) -> str:
+    return base64.b64encode(data).decode("ascii")
+
+
 class OllamaBackend(OCRBackend):
     """Self-hosted OCR backend via OpenAI-compatible API.
 
@@ -20,18 +30,55 @@ class OllamaBackend(OCRBackend):
     http://localhost:8000 for vLLM).
     """
 
-    def __init__(self, ollama_url: str, model: str = "deepseek-ai/DeepSeek-OCR"):
+    def __init__(
+        self,
+        ollama_url: str,
+        model: str = "deepseek-ai/DeepSeek-OCR",
+        max_connections: int = 64,
+        http2: bool = False,
+    ):
+        super().__init__()
         self._base_url = ollama_url.rstrip("/")
         self._model = model
+        self._max_connections = max(1, max_connections)
+        self._http2 = http2
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        # Created lazily so it binds to the running loop; shared by all
+        # calls so requests reuse keep-alive connections to the server.
+        if self._client is None or self._client.is_closed:
+            limits = httpx.Limits(
+                max_keepalive_connections=self._max_connections,
+                max_connections=self._max_connections,
+                keepalive_expiry=60,
+            )
+            self._client = httpx.AsyncClient(
+                base_url=self._base_url,
+                # Inference can take minutes; connecting and sending cannot.
+                timeout=httpx.Timeout(connect=10.0, read=300.0, write=30.0, pool=None),
+                # retries only covers failed connection attempts, so it
+                # never resends a request the server may have processed.
+                transport=httpx.AsyncHTTPTransport(
+                    limits=limits, http2=self._http2, retries=2
+                ),
+            )
+        return self._client
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
 
-    async def process_image(self, image_bytes: bytes) -> str:
+    async def _process_image_impl(self, image_bytes: bytes) -> str:
         if not self._base_url:
             raise OCRProcessingError(
                 "Self-hosted backend not configured: set OLLAMA_URL env var"
             )
 
-        base64_str = base64.b64encode(image_bytes).decode("utf-8")
-        data_uri = f"data:image/png;base64,{base64_str}"
+        # Encoding a multi-MB page is CPU work; keep it off the event loop.
+        base64_str = await asyncio.to_thread(_b64encode_str, image_bytes)
+        data_uri = f"data:{sniff_media_type(image_bytes)};base64,{base64_str}"
 
         # Try OpenAI-compatible API first (/v1/chat/completions)
         # Works with both vLLM and Ollama
@@ -51,33 +98,33 @@ class OllamaBackend(OCRBackend):
     async def _call_openai_api(self, data_uri: str) -> str:
         """Call OpenAI-compatible /v1/chat/completions (vLLM, Ollama)."""
         try:
-            async with httpx.AsyncClient(timeout=300.0) as client:
-                response = await client.post(
-                    f"{self._base_url}/v1/chat/completions",
-                    json={
-                        "model": self._model,
-                        "messages": [
-                            {
-                                "role": "user",
-                                "content": [
-                                    {
-                                        "type": "image_url",
-                                        "image_url": {"url": data_uri},
-                                    },
-                                    {
-                                        "type": "text",
-                                        "text": "<|grounding|>Convert the document to markdown.",
-                                    },
-                                ],
-                            }
-                        ],
-                        "max_tokens": 8192,
-                        "temperature": 0.0,
-                    },
-                )
-                response.raise_for_status()
-                data = response.json()
-                return data["choices"][0]["message"]["content"]
+            client = self._get_client()
+            response = await client.post(
+                "/v1/chat/completions",
+                json={
+                    "model": self._model,
+                    "messages": [
+                        {
+                            "role": "user",
+                            "content": [
+                                {
+                                    "type": "image_url",
+                                    "image_url": {"url": data_uri},
+                                },
+                                {
+                                    "type": "text",
+                                    "text": "<|grounding|>Convert the document to markdown.",
+                                },
+                            ],
+                        }
+                    ],
+                    "max_tokens": 8192,
+                    "temperature": 0.0,
+                },
+            )
+            response.raise_for_status()
+            data = response.json()
+            return data["choices"][0]["message"]["content"]
         except httpx.HTTPError as e:
             raise OCRProcessingError(
                 f"OpenAI API request failed: {e}"
@@ -90,19 +137,19 @@ class OllamaBackend(OCRBackend):
     async def _call_ollama_api(self, base64_str: str) -> str:
         """Call Ollama native /api/generate."""
         try:
-            async with httpx.AsyncClient(timeout=300.0) as client:
-                response = await client.post(
-                    f"{self._base_url}/api/generate",
-                    json={
-                        "model": self._model,
-                        "prompt": "<image>\n<|grounding|>Convert the document to markdown.",
-                        "images": [base64_str],
-                        "stream": False,
-                    },
-                )
-                response.raise_for_status()
-                data = response.json()
-                return data["response"]
+            client = self._get_client()
+            response = await client.post(
+                "/api/generate",
+                json={
+                    "model": self._model,
+                    "prompt": "<image>\n<|grounding|>Convert the document to markdown.",
+                    "images": [base64_str],
+                    "stream": False,
+                },
+            )
+            response.raise_for_status()
+            data = response.json()
+            return data["response"]
         except httpx.HTTPError as e:
             raise OCRProcessingError(
                 f"Ollama API request failed: {e}"
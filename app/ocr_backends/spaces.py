@@ -0,0 +1,67 @@
+import logging
+import mimetypes
+import os
+import tempfile
+from functools import lru_cache
+from typing import Optional
+
+from gradio_client import Client
+
+from app.ocr_backends.base import sniff_media_type
+
+logger = logging.getLogger(__name__)
+
+# gradio_client.handle_file only accepts a path or URL, so images are staged
+# on tmpfs when the host has one and never touch the disk. tmpfs can be small
+# (64 MB by default in Docker), so stage_image falls back to the default temp
+# directory when it is full.
+_STAGING_DIR: Optional[str] = None
+if os.path.isdir("/dev/shm") and os.access("/dev/shm", os.W_OK):
+    _STAGING_DIR = "/dev/shm"
+
+
+@lru_cache(maxsize=8)
+def get_space_client(space: str, hf_token: str) -> Client:
+    """Return a process-wide gradio Client for a HuggingFace Space.
+
+    Creating a Client fetches the Space config over HTTP, so backends share
+    one per (space, token) instead of handshaking per instance.
+    """
+    return Client(space, token=hf_token)
+
+
+def reset_space_clients() -> None:
+    """Drop cached clients so the next call reconnects (used after errors)."""
+    get_space_client.cache_clear()
+
+
+def _write_staged(
+    image_bytes: bytes, suffix: Optional[str], dir: Optional[str]
+) -> str:
+    fd, path = tempfile.mkstemp(suffix=suffix, dir=dir)
+    try:
+        with os.fdopen(fd, "wb") as tmp:
+            tmp.write(image_bytes)
+    except BaseException:
+        # The caller never sees the path, so a partial file would leak.
+        os.unlink(path)
+        raise
+    return path
+
+
+def stage_image(image_bytes: bytes, suffix: Optional[str] = None) -> str:
+    """Write image bytes to a temp file for upload; the caller unlinks it.
+
+    The suffix defaults to one matching the image format, since the Space
+    infers the type of an uploaded file from its name.
+    """
+    if suffix is None:
+        suffix = mimetypes.guess_extension(sniff_media_type(image_bytes))
+    if _STAGING_DIR is not None:
+        try:
+            return _write_staged(image_bytes, suffix, _STAGING_DIR)
+        except OSError as e:
+            logger.warning(
+                f"Staging in {_STAGING_DIR} failed ({e}), using temp dir"
+            )
+    return _write_staged(image_bytes, suffix, None)
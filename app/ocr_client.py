@@ -1,3 +1,5 @@
+from functools import lru_cache
+
 from app.config import get_settings
 from app.ocr_backends.base import OCRBackend
 from app.ocr_backends.huggingface import HuggingFaceBackend
@@ -5,14 +7,36 @@ from app.ocr_backends.deepseek import DeepSeekBackend
 from app.ocr_backends.ollama import OllamaBackend
 
 
+@lru_cache(maxsize=1)
 def get_ocr_backend() -> OCRBackend:
+    """Return the process-wide OCR backend for the configured settings.
+
+    Shared so every caller reuses the same thread pool and HTTP/Space
+    clients.
+    """
     settings = get_settings()
     if settings.OCR_BACKEND == "ollama":
-        return OllamaBackend(ollama_url=settings.OLLAMA_URL)
+        return OllamaBackend(
+            ollama_url=settings.OLLAMA_URL,
+            max_connections=settings.NUM_WORKERS * 2,
+            http2=settings.OLLAMA_HTTP2,
+        )
     if settings.OCR_BACKEND == "deepseek":
         return DeepSeekBackend(
-            hf_token=settings.HF_TOKEN, mode=settings.OCR_MODE
+            hf_token=settings.HF_TOKEN,
+            mode=settings.OCR_MODE,
+            max_workers=settings.NUM_WORKERS,
         )
+    speculative = settings.OCR_SPECULATIVE_TABLE
     return HuggingFaceBackend(
-        hf_token=settings.HF_TOKEN, mode=settings.OCR_MODE
+        hf_token=settings.HF_TOKEN,
+        mode=settings.OCR_MODE,
+        # Speculative auto mode runs Text and Table side by side per worker.
+        max_workers=settings.NUM_WORKERS * (2 if speculative else 1),
+        speculative_table=speculative,
     )
+
+
+def reset_ocr_backend() -> None:
+    """Forget the cached backend (after it is closed, or in tests)."""
+    get_ocr_backend.cache_clear()
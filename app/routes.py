@@ -1,23 +1,42 @@
+import asyncio
+import hashlib
 import logging
+import mimetypes
+import os
+import re
+import tempfile
+from collections import OrderedDict
 from io import BytesIO
+from pathlib import Path
 from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Response, UploadFile
+from fastapi import (
+    APIRouter,
+    Depends,
+    HTTPException,
+    Request,
+    Response,
+    UploadFile,
+)
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.config import get_settings
 from app.crud import (
     create_job,
-    create_page_job,
+    create_page_jobs,
     delete_job,
     get_job,
+    get_page_image_info,
     get_page_jobs,
+    get_page_status_counts,
     get_queue_depth,
     list_jobs,
+    stream_page_image,
 )
 from app.database import get_db
-import re
-
+from app.models import OcrJob
+from app.ocr_backends.base import sniff_media_type
 from app.schemas import (
     HealthResponse,
     JobListResponse,
@@ -31,33 +50,92 @@ from app.schemas import (
 
 logger = logging.getLogger(__name__)
 
-ALLOWED_EXTENSIONS = {".pdf", ".png", ".jpg", ".jpeg", ".tiff", ".bmp", ".webp"}
-ALLOWED_CONTENT_TYPES = {
-    "application/pdf",
-    "image/png",
-    "image/jpeg",
-    "image/tiff",
-    "image/bmp",
-    "image/webp",
-}
+ALLOWED_EXTENSIONS = frozenset(
+    {".pdf", ".png", ".jpg", ".jpeg", ".tiff", ".bmp", ".webp"}
+)
+ALLOWED_CONTENT_TYPES = frozenset(
+    {
+        "application/pdf",
+        "image/png",
+        "image/jpeg",
+        "image/tiff",
+        "image/bmp",
+        "image/webp",
+    }
+)
+_ALLOWED_EXTENSIONS_TEXT = ", ".join(sorted(ALLOWED_EXTENSIONS))
+
+_HEADING_RE = re.compile(r"^(#{1,6})[ \t]+(.+)$", re.MULTILINE)
+
+# Parsed sections keyed by (job_id, etag); a new etag means new page results.
+_SECTIONS_CACHE_SIZE = 128
+_sections_cache: OrderedDict[tuple[str, str], list[Section]] = OrderedDict()
 
 ocr_router = APIRouter(prefix="/ocr")
 health_router = APIRouter()
 
 
+_UPLOAD_CHUNK_SIZE = 1 << 20
+_PAGE_INSERT_BATCH = 16
+
+
+async def _read_upload(file: UploadFile, max_size: int) -> Optional[bytes]:
+    """Read an upload in chunks, or return None once it exceeds ``max_size``.
+
+    Oversized uploads are rejected as soon as the limit is crossed rather
+    than after the whole body has been buffered.
+    """
+    if file.size is not None and file.size > max_size:
+        return None
+
+    buf = BytesIO()
+    total = 0
+    while chunk := await file.read(_UPLOAD_CHUNK_SIZE):
+        total += len(chunk)
+        if total > max_size:
+            return None
+        buf.write(chunk)
+    return buf.getvalue()
+
+
+def _render_pdf_pages(file_bytes: bytes, output_folder: str) -> list[Path]:
+    """Rasterize a PDF to JPEG files in ``output_folder``, in page order.
+
+    Poppler writes the JPEGs itself, split across ``cpu_count`` pdftoppm
+    processes, so no PIL decode/re-encode happens. Quality 90 keeps text
+    edges clean for OCR at a fraction of the PNG size. Blocking; run it off
+    the event loop.
+    """
+    from pdf2image import convert_from_bytes
+
+    paths = convert_from_bytes(
+        file_bytes,
+        dpi=150,
+        fmt="jpeg",
+        jpegopt={"quality": 90, "progressive": False, "optimize": False},
+        output_folder=output_folder,
+        thread_count=os.cpu_count() or 1,
+        paths_only=True,
+    )
+    return [Path(p) for p in paths]
+
+
+def _read_files(paths: list[Path]) -> list[bytes]:
+    return [path.read_bytes() for path in paths]
+
+
 @ocr_router.post("/submit", response_model=JobSubmitResponse)
 async def submit_job(file: UploadFile, db: AsyncSession = Depends(get_db)):
     settings = get_settings()
 
     # Validate file extension
     filename = file.filename or ""
-    ext = ""
-    if "." in filename:
-        ext = "." + filename.rsplit(".", 1)[1].lower()
+    # splitext gives dotfiles such as ".png" no extension, unlike rsplit
+    ext = os.path.splitext(filename)[1].lower()
     if ext not in ALLOWED_EXTENSIONS:
         raise HTTPException(
             status_code=400,
-            detail=f"Unsupported file type '{ext}'. Allowed: {', '.join(sorted(ALLOWED_EXTENSIONS))}",
+            detail=f"Unsupported file type '{ext}'. Allowed: {_ALLOWED_EXTENSIONS_TEXT}",
         )
 
     # Validate content type
@@ -68,52 +146,75 @@ async def submit_job(file: UploadFile, db: AsyncSession = Depends(get_db)):
         )
 
     # Read file and validate size
-    file_bytes = await file.read()
     max_size = settings.MAX_FILE_SIZE_MB * 1024 * 1024
-    if len(file_bytes) > max_size:
+    file_bytes = await _read_upload(file, max_size)
+    if file_bytes is None:
         raise HTTPException(
             status_code=413,
             detail=f"File size exceeds maximum of {settings.MAX_FILE_SIZE_MB} MB.",
         )
 
     # Convert to page images
-    pages: list[bytes] = []
-    file_type = "image"
-
-    if ext == ".pdf":
-        file_type = "pdf"
-        try:
-            from pdf2image import convert_from_bytes
-
-            pil_images = convert_from_bytes(file_bytes, dpi=150)
-            for img in pil_images:
-                buf = BytesIO()
-                img.save(buf, "PNG")
-                pages.append(buf.getvalue())
-        except Exception as e:
-            logger.error("Failed to convert PDF: %s", e)
-            raise HTTPException(status_code=400, detail=f"Failed to process PDF: {e}")
+    file_type = "pdf" if ext == ".pdf" else "image"
+
+    if file_type == "pdf":
+        with tempfile.TemporaryDirectory(prefix="ocr-pdf-") as render_dir:
+            try:
+                page_paths = await asyncio.to_thread(
+                    _render_pdf_pages, file_bytes, render_dir
+                )
+            except Exception as e:
+                logger.error("Failed to convert PDF: %s", e)
+                raise HTTPException(status_code=400, detail=f"Failed to process PDF: {e}")
+            total_pages = len(page_paths)
+
+            job = await create_job(
+                db,
+                original_filename=filename,
+                total_pages=total_pages,
+                file_type=file_type,
+            )
+            # Insert pages in batches: one executemany per batch, while only
+            # a batch of rendered pages is held in memory at a time.
+            for start in range(0, total_pages, _PAGE_INSERT_BATCH):
+                batch = page_paths[start : start + _PAGE_INSERT_BATCH]
+                images = await asyncio.to_thread(_read_files, batch)
+                await create_page_jobs(
+                    db,
+                    job.job_id,
+                    list(enumerate(images, start=start + 1)),
+                    media_type="image/jpeg",
+                )
     else:
-        pages.append(file_bytes)
-
-    total_pages = len(pages)
-
-    # Create job and page jobs
-    job = await create_job(
-        db,
-        original_filename=filename,
-        total_pages=total_pages,
-        file_type=file_type,
-    )
-
-    for i, page_bytes in enumerate(pages):
-        await create_page_job(
+        total_pages = 1
+        job = await create_job(
             db,
-            job_id=job.job_id,
-            page_number=i + 1,
-            image_data=page_bytes,
+            original_filename=filename,
+            total_pages=total_pages,
+            file_type=file_type,
+        )
+        await create_page_jobs(
+            db,
+            job.job_id,
+            [(1, file_bytes)],
+            # The stored type is served for this content from now on, so
+            # trust the bytes over the client's Content-Type header.
+            media_type=(
+                sniff_media_type(file_bytes, default=None)
+                or mimetypes.guess_type(filename)[0]
+                or file.content_type
+            ),
         )
 
+    # Commit before waking workers so they can see the new page jobs.
+    await db.commit()
+    try:
+        from app.worker import worker_manager
+
+        worker_manager.notify_new_work()
+    except ImportError:
+        pass
+
     logger.info("Created job %s with %d pages", job.job_id, total_pages)
 
     return JobSubmitResponse(
@@ -129,24 +230,25 @@ async def get_job_status(job_id: str, db: AsyncSession = Depends(get_db)):
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
 
-    page_jobs = await get_page_jobs(db, job_id)
-    completed_pages = sum(1 for p in page_jobs if p.status == "completed")
-    failed_pages = sum(1 for p in page_jobs if p.status == "failed")
+    counts = await get_page_status_counts(db, job_id)
 
     return JobStatusResponse(
         job_id=job.job_id,
         status=job.status,
         total_pages=job.total_pages,
-        completed_pages=completed_pages,
-        failed_pages=failed_pages,
+        completed_pages=counts.get("completed", 0),
+        failed_pages=counts.get("failed", 0),
         created_at=job.created_at,
         updated_at=job.updated_at,
     )
 
 
 def _parse_sections(pages: list[PageResult]) -> list[Section]:
-    """Parse markdown headings into structured sections across all pages."""
-    heading_re = re.compile(r"^(#{1,6})\s+(.+)$", re.MULTILINE)
+    """Parse markdown headings into structured sections across all pages.
+
+    Sections are built with model_construct: every field comes from this
+    parser, so per-instance validation would only re-check our own values.
+    """
     sections: list[Section] = []
 
     for page in pages:
@@ -154,67 +256,112 @@ def _parse_sections(pages: list[PageResult]) -> list[Section]:
             continue
 
         text = page.markdown_text
-        matches = list(heading_re.finditer(text))
+        prev = None
+
+        # Each heading owns the text up to the next heading, so a section is
+        # emitted when the following heading (or the end of page) is seen.
+        for m in _HEADING_RE.finditer(text):
+            if prev is None:
+                # Content before first heading
+                pre = text[: m.start()].strip()
+                if pre:
+                    sections.append(Section.model_construct(
+                        heading="(untitled)",
+                        level=0,
+                        page=page.page_number,
+                        content=pre,
+                    ))
+            else:
+                sections.append(Section.model_construct(
+                    heading=prev.group(2).strip(),
+                    level=len(prev.group(1)),
+                    page=page.page_number,
+                    content=text[prev.end() : m.start()].strip(),
+                ))
+            prev = m
 
-        if not matches:
+        if prev is None:
             # No headings — entire page is one section
             content = text.strip()
             if content:
-                sections.append(Section(
+                sections.append(Section.model_construct(
                     heading="(untitled)",
                     level=0,
                     page=page.page_number,
                     content=content,
                 ))
-            continue
-
-        # Content before first heading
-        pre = text[: matches[0].start()].strip()
-        if pre:
-            sections.append(Section(
-                heading="(untitled)",
-                level=0,
+        else:
+            sections.append(Section.model_construct(
+                heading=prev.group(2).strip(),
+                level=len(prev.group(1)),
                 page=page.page_number,
-                content=pre,
-            ))
-
-        # Each heading and its content until the next heading
-        for i, m in enumerate(matches):
-            level = len(m.group(1))
-            heading = m.group(2).strip()
-            start = m.end()
-            end = matches[i + 1].start() if i + 1 < len(matches) else len(text)
-            content = text[start:end].strip()
-
-            sections.append(Section(
-                heading=heading,
-                level=level,
-                page=page.page_number,
-                content=content,
+                content=text[prev.end() :].strip(),
             ))
 
     return sections
 
 
+def _job_etag(job: OcrJob, counts: dict[str, int]) -> str:
+    """Weak ETag over the job state and its per-status page counts.
+
+    Every page transition changes the counts, so the tag moves whenever a
+    page result is written, even within the one-second resolution of
+    updated_at.
+    """
+    state = f"{job.updated_at.isoformat()}|{job.status}|{sorted(counts.items())}"
+    digest = hashlib.blake2b(state.encode(), digest_size=8).hexdigest()
+    return f'W/"{digest}"'
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # Weak comparison: the W/ prefix is ignored on both sides.
+    tag = etag.removeprefix("W/")
+    return any(t.strip().removeprefix("W/") == tag for t in header.split(","))
+
+
+def _cache_headers(job: OcrJob, etag: str) -> dict[str, str]:
+    headers = {"ETag": etag}
+    if job.status == "completed":
+        headers["Cache-Control"] = "private, max-age=1"
+    return headers
+
+
+async def _get_page_results(db: AsyncSession, job_id: str) -> list[PageResult]:
+    page_jobs = await get_page_jobs(db, job_id)
+    return [
+        PageResult(
+            page_number=p.page_number,
+            markdown_text=p.markdown_text,
+            status=p.status,
+        )
+        for p in page_jobs
+    ]
+
+
 @ocr_router.get("/result/{job_id}", response_model=JobResultResponse)
-async def get_job_result(job_id: str, db: AsyncSession = Depends(get_db)):
+async def get_job_result(
+    job_id: str,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_db),
+):
     """Get raw markdown result per page."""
     job = await get_job(db, job_id)
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
 
-    page_jobs = await get_page_jobs(db, job_id)
-    pages = sorted(
-        [
-            PageResult(
-                page_number=p.page_number,
-                markdown_text=p.markdown_text,
-                status=p.status,
-            )
-            for p in page_jobs
-        ],
-        key=lambda p: p.page_number,
-    )
+    etag = _job_etag(job, await get_page_status_counts(db, job_id))
+    headers = _cache_headers(job, etag)
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+
+    pages = await _get_page_results(db, job_id)
 
     return JobResultResponse(
         job_id=job.job_id,
@@ -225,26 +372,32 @@ async def get_job_result(job_id: str, db: AsyncSession = Depends(get_db)):
 
 
 @ocr_router.get("/sections/{job_id}", response_model=JobSectionsResponse)
-async def get_job_sections(job_id: str, db: AsyncSession = Depends(get_db)):
+async def get_job_sections(
+    job_id: str,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_db),
+):
     """Get structured sections parsed from markdown headings."""
     job = await get_job(db, job_id)
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
 
-    page_jobs = await get_page_jobs(db, job_id)
-    pages = sorted(
-        [
-            PageResult(
-                page_number=p.page_number,
-                markdown_text=p.markdown_text,
-                status=p.status,
-            )
-            for p in page_jobs
-        ],
-        key=lambda p: p.page_number,
-    )
-
-    sections = _parse_sections(pages)
+    etag = _job_etag(job, await get_page_status_counts(db, job_id))
+    headers = _cache_headers(job, etag)
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+
+    key = (job_id, etag)
+    sections = _sections_cache.get(key)
+    if sections is None:
+        sections = _parse_sections(await _get_page_results(db, job_id))
+        _sections_cache[key] = sections
+        if len(_sections_cache) > _SECTIONS_CACHE_SIZE:
+            _sections_cache.popitem(last=False)
+    else:
+        _sections_cache.move_to_end(key)
 
     return JobSectionsResponse(
         job_id=job.job_id,
@@ -287,6 +440,24 @@ async def list_all_jobs(
     )
 
 
+@ocr_router.get("/jobs/{job_id}/pages/{page_number}/image")
+async def get_page_image_endpoint(
+    job_id: str, page_number: int, db: AsyncSession = Depends(get_db)
+):
+    """Stream the stored image for one page of a job."""
+    job = await get_job(db, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    image = await get_page_image_info(db, job_id, page_number)
+    if image is None:
+        raise HTTPException(status_code=404, detail="Page not found")
+
+    return StreamingResponse(
+        stream_page_image(db, image.rowid), media_type=image.media_type
+    )
+
+
 @ocr_router.delete("/jobs/{job_id}", status_code=204)
 async def delete_job_endpoint(job_id: str, db: AsyncSession = Depends(get_db)):
     job = await get_job(db, job_id)
@@ -1,9 +1,10 @@
 import asyncio
 import logging
 import uuid
-from typing import List
+from typing import List, Optional
 
-from app.ocr_client import get_ocr_backend
+from app.ocr_backends.base import OCRBackend
+from app.ocr_client import get_ocr_backend, reset_ocr_backend
 
 logger = logging.getLogger(__name__)
 
@@ -12,13 +13,18 @@ class WorkerManager:
     def __init__(self):
         self._workers: List[asyncio.Task] = []
         self._stop_event = asyncio.Event()
+        self._work_available = asyncio.Event()
         self._worker_ids: List[str] = []
+        # Only touched between awaits on the event loop, so no lock needed.
         self._active_count = 0
-        self._lock = asyncio.Lock()
+        self._ocr_backend: Optional[OCRBackend] = None
 
     async def start(self, num_workers: int) -> None:
         """Start N worker coroutines."""
         self._stop_event.clear()
+        # One backend shared by all workers, so its thread pool bounds
+        # concurrent OCR calls across the whole manager.
+        self._ocr_backend = get_ocr_backend()
         for i in range(num_workers):
             worker_id = f"worker-{i + 1}-{uuid.uuid4().hex[:8]}"
             self._worker_ids.append(worker_id)
@@ -26,13 +32,22 @@ class WorkerManager:
             self._workers.append(task)
         logger.info(f"Started {num_workers} OCR workers")
 
+    def notify_new_work(self) -> None:
+        """Wake idle workers after new page jobs have been committed."""
+        self._work_available.set()
+
     async def stop(self) -> None:
         """Signal workers to stop and wait for them."""
         self._stop_event.set()
+        self._work_available.set()
         if self._workers:
             await asyncio.gather(*self._workers, return_exceptions=True)
         self._workers.clear()
         self._worker_ids.clear()
+        if self._ocr_backend is not None:
+            await self._ocr_backend.aclose()
+            self._ocr_backend = None
+            reset_ocr_backend()
         logger.info("All OCR workers stopped")
 
     @property
@@ -47,14 +62,13 @@ class WorkerManager:
         """Main worker loop: poll DB, claim jobs, process, save results."""
         from app.database import AsyncSessionLocal
         from app.crud import (
-            claim_page_job,
-            get_next_queued_page,
-            update_page_job_result,
-            check_and_update_parent_status,
+            claim_next_queued_page,
+            finalize_page_job,
+            get_page_image,
         )
         from app.ocr_backends.base import OCRProcessingError
 
-        ocr_backend = get_ocr_backend()
+        ocr_backend = self._ocr_backend
         logger.info(f"[{worker_id}] Worker started")
 
         while not self._stop_event.is_set():
@@ -65,29 +79,40 @@ class WorkerManager:
                 page_number = None
                 image_data = None
 
+                # Clear before claiming so a notify that lands between an
+                # empty claim and the wait below is not lost.
+                self._work_available.clear()
                 async with AsyncSessionLocal() as db:
-                    page_job = await get_next_queued_page(db)
-                    if page_job is None:
-                        await asyncio.sleep(1.0)
-                        continue
+                    page_job = await claim_next_queued_page(db, worker_id)
+                    if page_job is not None:
+                        page_job_id = page_job.id
+                        parent_job_id = page_job.parent_job_id
+                        page_number = page_job.page_number
+                        image_data = await get_page_image(db, page_job_id)
+                        await db.commit()
 
-                    claimed = await claim_page_job(db, page_job.id, worker_id)
-                    await db.commit()
-                    if not claimed:
-                        continue  # Another worker got it
+                if page_job is None:
+                    # The timeout is a safety net for work queued by
+                    # another process or a missed notification.
+                    try:
+                        await asyncio.wait_for(
+                            self._work_available.wait(), timeout=5.0
+                        )
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
 
-                    page_job_id = page_job.id
-                    parent_job_id = page_job.parent_job_id
-                    page_number = page_job.page_number
-                    image_data = page_job.image_data
+                # Pass the wake-up on: the clear above may have swallowed a
+                # notify meant for an idle worker, and more pages may be
+                # queued behind this one.
+                self._work_available.set()
 
                 logger.info(
                     f"[{worker_id}] Processing page job {page_job_id} "
                     f"(page {page_number})"
                 )
 
-                async with self._lock:
-                    self._active_count += 1
+                self._active_count += 1
 
                 try:
                     # Step 2: Process OCR
@@ -95,11 +120,12 @@ class WorkerManager:
 
                     # Step 3: Save result
                     async with AsyncSessionLocal() as db:
-                        await update_page_job_result(
-                            db, page_job_id, markdown_text, "completed"
-                        )
-                        await check_and_update_parent_status(
-                            db, parent_job_id
+                        await finalize_page_job(
+                            db,
+                            page_job_id,
+                            parent_job_id,
+                            markdown_text,
+                            "completed",
                         )
                         await db.commit()
                     logger.info(
@@ -111,11 +137,13 @@ class WorkerManager:
                         f"{page_job_id}: {e}"
                     )
                     async with AsyncSessionLocal() as db:
-                        await update_page_job_result(
-                            db, page_job_id, None, "failed", str(e)
-                        )
-                        await check_and_update_parent_status(
-                            db, parent_job_id
+                        await finalize_page_job(
+                            db,
+                            page_job_id,
+                            parent_job_id,
+                            None,
+                            "failed",
+                            str(e),
                         )
                         await db.commit()
                 except Exception as e:
@@ -124,16 +152,17 @@ class WorkerManager:
                         exc_info=True,
                     )
                     async with AsyncSessionLocal() as db:
-                        await update_page_job_result(
-                            db, page_job_id, None, "failed", str(e)
-                        )
-                        await check_and_update_parent_status(
-                            db, parent_job_id
+                        await finalize_page_job(
+                            db,
+                            page_job_id,
+                            parent_job_id,
+                            None,
+                            "failed",
+                            str(e),
                         )
                         await db.commit()
                 finally:
-                    async with self._lock:
-                        self._active_count -= 1
+                    self._active_count -= 1
 
             except Exception as e:
                 logger.error(
@@ -1,52 +1,146 @@
+import os
+import shutil
+from contextvars import ContextVar
+from io import BytesIO
+from pathlib import Path
+
+import pytest
 import pytest_asyncio
 from typing import AsyncGenerator
 
 from httpx import AsyncClient, ASGITransport
+from PIL import Image
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
 
 from app.models import Base
 from app.database import get_db
 from app.main import app
 
-TEST_DB_URL = "sqlite+aiosqlite:///:memory:"
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+# Test databases are throwaway copies, so durability is not worth an fsync.
+# locking_mode=EXCLUSIVE is left out: tests and the API client hold separate
+# connections to the same file.
+TEST_SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=MEMORY",
+    "PRAGMA synchronous=OFF",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=268435456",
+    # Skip per-row constraint checks; tests marked "fk" turn them back on.
+    "PRAGMA foreign_keys=OFF",
+)
+
+
+def _enable_foreign_keys(dbapi_connection, connection_record) -> None:
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute("PRAGMA foreign_keys=ON")
+    finally:
+        cursor.close()
+
+
+def _apply_test_pragmas(dbapi_connection, connection_record) -> None:
+    cursor = dbapi_connection.cursor()
+    try:
+        for pragma in TEST_SQLITE_PRAGMAS:
+            cursor.execute(pragma)
+    finally:
+        cursor.close()
+
+
+@pytest.fixture(scope="session")
+def png_bytes() -> bytes:
+    return (PROJECT_ROOT / "test_page1.png").read_bytes()
+
+
+@pytest.fixture(scope="session")
+def tiny_png_bytes() -> bytes:
+    """A 32x32 PNG for tests that only need the upload to be accepted."""
+    buf = BytesIO()
+    Image.new("RGB", (32, 32), "white").save(buf, "PNG")
+    return buf.getvalue()
+
+
+@pytest.fixture(scope="session")
+def pdf_bytes() -> bytes:
+    return (PROJECT_ROOT / "test_document.pdf").read_bytes()
+
+
+@pytest.fixture(scope="session")
+def template_db(tmp_path_factory):
+    """SQLite file with the schema created once; each test gets a copy.
+
+    Under pytest-xdist every worker process builds its own template.
+    """
+    worker_id = os.environ.get("PYTEST_XDIST_WORKER", "main")
+    path = tmp_path_factory.mktemp("db") / f"template_{worker_id}.sqlite"
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    engine.dispose()
+    return path
 
 
 @pytest_asyncio.fixture(scope="function")
-async def test_db_engine():
-    engine = create_async_engine(TEST_DB_URL, echo=False)
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
-    yield engine
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.drop_all)
+async def test_db_engine(template_db, tmp_path, request):
+    """(engine, session factory) for a fresh copy of the template database."""
+    db_path = tmp_path / "test.sqlite"
+    shutil.copyfile(template_db, db_path)
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{db_path}",
+        echo=False,
+        connect_args={"check_same_thread": False},
+        # Each test uses a connection or two; no pool to keep or tear down.
+        poolclass=NullPool,
+    )
+    event.listen(engine.sync_engine, "connect", _apply_test_pragmas)
+    if request.node.get_closest_marker("fk"):
+        event.listen(engine.sync_engine, "connect", _enable_foreign_keys)
+    yield engine, async_sessionmaker(engine, expire_on_commit=False)
     await engine.dispose()
 
 
 @pytest_asyncio.fixture(scope="function")
 async def db_session(test_db_engine) -> AsyncGenerator[AsyncSession, None]:
-    TestSessionLocal = async_sessionmaker(test_db_engine, expire_on_commit=False)
+    _, TestSessionLocal = test_db_engine
     async with TestSessionLocal() as session:
         yield session
 
 
+# Session factory for the running test's database; the get_db override
+# installed once per session reads it, so tests never touch the overrides.
+_test_sessionmaker: ContextVar[async_sessionmaker] = ContextVar("_test_sessionmaker")
+
+
+async def _override_get_db():
+    async with _test_sessionmaker.get()() as session:
+        try:
+            yield session
+            await session.commit()
+        except Exception:
+            await session.rollback()
+            raise
+
+
+@pytest_asyncio.fixture(scope="session")
+async def _http_client() -> AsyncGenerator[AsyncClient, None]:
+    app.dependency_overrides[get_db] = _override_get_db
+    try:
+        async with AsyncClient(
+            transport=ASGITransport(app=app), base_url="http://test"
+        ) as ac:
+            yield ac
+    finally:
+        app.dependency_overrides.pop(get_db, None)
+
+
 @pytest_asyncio.fixture(scope="function")
-async def client(test_db_engine) -> AsyncGenerator[AsyncClient, None]:
-    TestSessionLocal = async_sessionmaker(test_db_engine, expire_on_commit=False)
-
-    async def override_get_db():
-        async with TestSessionLocal() as session:
-            try:
-                yield session
-                await session.commit()
-            except Exception:
-                await session.rollback()
-                raise
-
-    app.dependency_overrides[get_db] = override_get_db
-
-    async with AsyncClient(
-        transport=ASGITransport(app=app), base_url="http://test"
-    ) as ac:
-        yield ac
-
-    app.dependency_overrides.clear()
+async def client(
+    _http_client, test_db_engine
+) -> AsyncGenerator[AsyncClient, None]:
+    """The shared client, with requests routed to this test's database."""
+    _, TestSessionLocal = test_db_engine
+    token = _test_sessionmaker.set(TestSessionLocal)
+    yield _http_client
+    _test_sessionmaker.reset(token)
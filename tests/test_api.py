@@ -1,7 +1,9 @@
 import pytest
-from pathlib import Path
 
-PROJECT_ROOT = Path("/home/claude-dev/projects/glm-ocr-service")
+from app.config import get_settings
+from app.crud import finalize_page_job, get_page_jobs
+from app.routes import _parse_sections
+from app.schemas import PageResult
 
 
 class TestHealthEndpoint:
@@ -15,25 +17,21 @@ class TestHealthEndpoint:
 
 
 class TestSubmitEndpoint:
-    async def test_submit_png_image(self, client):
-        img_path = PROJECT_ROOT / "test_page1.png"
-        with open(img_path, "rb") as f:
-            response = await client.post(
-                "/ocr/submit",
-                files={"file": ("test_page1.png", f, "image/png")},
-            )
+    async def test_submit_png_image(self, client, png_bytes):
+        response = await client.post(
+            "/ocr/submit",
+            files={"file": ("test_page1.png", png_bytes, "image/png")},
+        )
         assert response.status_code == 200
         data = response.json()
         assert "job_id" in data
         assert data["total_pages"] == 1
 
-    async def test_submit_pdf(self, client):
-        pdf_path = PROJECT_ROOT / "test_document.pdf"
-        with open(pdf_path, "rb") as f:
-            response = await client.post(
-                "/ocr/submit",
-                files={"file": ("test_document.pdf", f, "application/pdf")},
-            )
+    async def test_submit_pdf(self, client, pdf_bytes):
+        response = await client.post(
+            "/ocr/submit",
+            files={"file": ("test_document.pdf", pdf_bytes, "application/pdf")},
+        )
         assert response.status_code == 200
         data = response.json()
         assert "job_id" in data
@@ -46,8 +44,21 @@ class TestSubmitEndpoint:
         )
         assert response.status_code == 400
 
-    async def test_submit_file_too_large(self, client):
-        large_data = b"x" * (51 * 1024 * 1024)  # 51 MB
+    @pytest.mark.parametrize("filename", [".png", "file.", "noext"])
+    async def test_submit_without_extension(
+        self, client, tiny_png_bytes, filename
+    ):
+        response = await client.post(
+            "/ocr/submit",
+            files={"file": (filename, tiny_png_bytes, "image/png")},
+        )
+        assert response.status_code == 400
+        assert response.json()["detail"].startswith("Unsupported file type")
+
+    async def test_submit_file_too_large(self, client, monkeypatch):
+        # Lower the limit rather than building a 50+ MB upload.
+        monkeypatch.setattr(get_settings(), "MAX_FILE_SIZE_MB", 1)
+        large_data = b"x" * (1024 * 1024 + 1)
         response = await client.post(
             "/ocr/submit",
             files={"file": ("large.png", large_data, "image/png")},
@@ -56,13 +67,11 @@ class TestSubmitEndpoint:
 
 
 class TestStatusEndpoint:
-    async def test_get_status_valid_job(self, client):
-        img_path = PROJECT_ROOT / "test_page1.png"
-        with open(img_path, "rb") as f:
-            submit_resp = await client.post(
-                "/ocr/submit",
-                files={"file": ("test_page1.png", f, "image/png")},
-            )
+    async def test_get_status_valid_job(self, client, tiny_png_bytes):
+        submit_resp = await client.post(
+            "/ocr/submit",
+            files={"file": ("tiny.png", tiny_png_bytes, "image/png")},
+        )
         job_id = submit_resp.json()["job_id"]
 
         response = await client.get(f"/ocr/status/{job_id}")
@@ -71,19 +80,13 @@ class TestStatusEndpoint:
         assert data["job_id"] == job_id
         assert data["status"] in ("queued", "processing", "completed", "failed")
 
-    async def test_get_status_invalid_job(self, client):
-        response = await client.get("/ocr/status/nonexistent-job-id")
-        assert response.status_code == 404
-
 
 class TestResultEndpoint:
-    async def test_get_result_valid_job(self, client):
-        img_path = PROJECT_ROOT / "test_page1.png"
-        with open(img_path, "rb") as f:
-            submit_resp = await client.post(
-                "/ocr/submit",
-                files={"file": ("test_page1.png", f, "image/png")},
-            )
+    async def test_get_result_valid_job(self, client, tiny_png_bytes):
+        submit_resp = await client.post(
+            "/ocr/submit",
+            files={"file": ("tiny.png", tiny_png_bytes, "image/png")},
+        )
         job_id = submit_resp.json()["job_id"]
 
         response = await client.get(f"/ocr/result/{job_id}")
@@ -92,8 +95,138 @@ class TestResultEndpoint:
         assert data["job_id"] == job_id
         assert "pages" in data
 
-    async def test_get_result_invalid_job(self, client):
-        response = await client.get("/ocr/result/nonexistent-id")
+    async def test_get_result_not_modified(self, client, tiny_png_bytes):
+        submit_resp = await client.post(
+            "/ocr/submit",
+            files={"file": ("tiny.png", tiny_png_bytes, "image/png")},
+        )
+        job_id = submit_resp.json()["job_id"]
+
+        response = await client.get(f"/ocr/result/{job_id}")
+        etag = response.headers["etag"]
+
+        response = await client.get(
+            f"/ocr/result/{job_id}", headers={"If-None-Match": etag}
+        )
+        assert response.status_code == 304
+        assert response.headers["etag"] == etag
+        assert response.content == b""
+
+
+class TestSectionsEndpoint:
+    async def test_get_sections_not_modified(self, client, tiny_png_bytes):
+        submit_resp = await client.post(
+            "/ocr/submit",
+            files={"file": ("tiny.png", tiny_png_bytes, "image/png")},
+        )
+        job_id = submit_resp.json()["job_id"]
+
+        response = await client.get(f"/ocr/sections/{job_id}")
+        etag = response.headers["etag"]
+
+        response = await client.get(
+            f"/ocr/sections/{job_id}", headers={"If-None-Match": etag}
+        )
+        assert response.status_code == 304
+        assert response.content == b""
+
+    async def test_sections_etag_changes_with_page_result(
+        self, client, db_session, tiny_png_bytes
+    ):
+        submit_resp = await client.post(
+            "/ocr/submit",
+            files={"file": ("tiny.png", tiny_png_bytes, "image/png")},
+        )
+        job_id = submit_resp.json()["job_id"]
+        response = await client.get(f"/ocr/sections/{job_id}")
+        etag = response.headers["etag"]
+        assert response.json()["sections"] == []
+
+        [page] = await get_page_jobs(db_session, job_id)
+        await finalize_page_job(
+            db_session, page.id, job_id, "# Title\nBody", "completed"
+        )
+        await db_session.commit()
+
+        response = await client.get(
+            f"/ocr/sections/{job_id}", headers={"If-None-Match": etag}
+        )
+        assert response.status_code == 200
+        assert response.headers["etag"] != etag
+        assert [s["heading"] for s in response.json()["sections"]] == ["Title"]
+
+
+def _sections(*texts):
+    pages = [
+        PageResult(page_number=n, markdown_text=text, status="completed")
+        for n, text in enumerate(texts, start=1)
+    ]
+    return [
+        (s.heading, s.level, s.page, s.content) for s in _parse_sections(pages)
+    ]
+
+
+class TestParseSections:
+    def test_no_headings(self):
+        assert _sections("Just text.\n\nMore text.\n", None, "  ") == [
+            ("(untitled)", 0, 1, "Just text.\n\nMore text."),
+        ]
+
+    def test_text_before_first_heading(self):
+        assert _sections("Preamble\n# Title\nBody") == [
+            ("(untitled)", 0, 1, "Preamble"),
+            ("Title", 1, 1, "Body"),
+        ]
+
+    def test_multiple_levels_and_pages(self):
+        assert _sections(
+            "# Report\nIntro\n## Scope\nDetails\n### Note\n",
+            "## Results\nAll good",
+        ) == [
+            ("Report", 1, 1, "Intro"),
+            ("Scope", 2, 1, "Details"),
+            ("Note", 3, 1, ""),
+            ("Results", 2, 2, "All good"),
+        ]
+
+    def test_hash_then_newline_is_not_a_heading(self):
+        # The heading text must be on the same line as the hashes.
+        assert _sections("#\nfoo") == [("(untitled)", 0, 1, "#\nfoo")]
+
+
+class TestPageImageEndpoint:
+    async def test_get_page_image(self, client, png_bytes):
+        submit_resp = await client.post(
+            "/ocr/submit",
+            files={"file": ("test_page1.png", png_bytes, "image/png")},
+        )
+        job_id = submit_resp.json()["job_id"]
+
+        response = await client.get(f"/ocr/jobs/{job_id}/pages/1/image")
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "image/png"
+        assert response.content == png_bytes
+
+    async def test_page_image_type_comes_from_bytes(
+        self, client, tiny_png_bytes
+    ):
+        submit_resp = await client.post(
+            "/ocr/submit",
+            files={"file": ("scan.jpg", tiny_png_bytes, "image/jpeg")},
+        )
+        job_id = submit_resp.json()["job_id"]
+
+        response = await client.get(f"/ocr/jobs/{job_id}/pages/1/image")
+        assert response.headers["content-type"] == "image/png"
+
+    async def test_get_page_image_missing_page(self, client, tiny_png_bytes):
+        submit_resp = await client.post(
+            "/ocr/submit",
+            files={"file": ("tiny.png", tiny_png_bytes, "image/png")},
+        )
+        job_id = submit_resp.json()["job_id"]
+
+        response = await client.get(f"/ocr/jobs/{job_id}/pages/2/image")
         assert response.status_code == 404
 
 
@@ -105,13 +238,11 @@ class TestListJobsEndpoint:
         assert data["jobs"] == []
         assert data["total"] == 0
 
-    async def test_list_jobs_with_filter(self, client):
-        img_path = PROJECT_ROOT / "test_page1.png"
-        with open(img_path, "rb") as f:
-            await client.post(
-                "/ocr/submit",
-                files={"file": ("test_page1.png", f, "image/png")},
-            )
+    async def test_list_jobs_with_filter(self, client, tiny_png_bytes):
+        await client.post(
+            "/ocr/submit",
+            files={"file": ("tiny.png", tiny_png_bytes, "image/png")},
+        )
 
         response = await client.get("/ocr/jobs?status=queued")
         assert response.status_code == 200
@@ -127,13 +258,11 @@ class TestListJobsEndpoint:
 
 
 class TestDeleteEndpoint:
-    async def test_delete_valid_job(self, client):
-        img_path = PROJECT_ROOT / "test_page1.png"
-        with open(img_path, "rb") as f:
-            submit_resp = await client.post(
-                "/ocr/submit",
-                files={"file": ("test_page1.png", f, "image/png")},
-            )
+    async def test_delete_valid_job(self, client, tiny_png_bytes):
+        submit_resp = await client.post(
+            "/ocr/submit",
+            files={"file": ("tiny.png", tiny_png_bytes, "image/png")},
+        )
         job_id = submit_resp.json()["job_id"]
 
         response = await client.delete(f"/ocr/jobs/{job_id}")
@@ -143,6 +272,19 @@ class TestDeleteEndpoint:
         status_resp = await client.get(f"/ocr/status/{job_id}")
         assert status_resp.status_code == 404
 
-    async def test_delete_invalid_job(self, client):
-        response = await client.delete("/ocr/jobs/nonexistent-id")
+
+class TestMissingJob:
+    @pytest.mark.parametrize(
+        "method,path",
+        [
+            ("GET", "/ocr/status/nonexistent-id"),
+            ("GET", "/ocr/result/nonexistent-id"),
+            ("GET", "/ocr/sections/nonexistent-id"),
+            ("GET", "/ocr/jobs/nonexistent-id/pages/1/image"),
+            ("DELETE", "/ocr/jobs/nonexistent-id"),
+        ],
+    )
+    async def test_missing_job_returns_404(self, client, method, path):
+        response = await client.request(method, path)
         assert response.status_code == 404
+        assert response.json()["detail"] == "Job not found"
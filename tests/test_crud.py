@@ -1,18 +1,25 @@
 import pytest
+from sqlalchemy.exc import IntegrityError
 
 from app.crud import (
     check_and_update_parent_status,
-    claim_page_job,
+    claim_next_queued_page,
     create_job,
     create_page_job,
+    create_page_jobs,
     delete_job,
+    finalize_page_job,
     get_job,
-    get_next_queued_page,
+    get_page_image,
+    get_page_image_info,
     get_page_jobs,
+    get_page_status_counts,
     get_queue_depth,
     list_jobs,
+    stream_page_image,
     update_page_job_result,
 )
+from app.models import OcrJob
 
 
 class TestJobCRUD:
@@ -40,16 +47,29 @@ class TestJobCRUD:
         assert len(jobs) == 2
 
     async def test_list_jobs_pagination(self, db_session):
-        for i in range(5):
-            await create_job(db_session, f"file{i}.pdf", "pdf", 1)
+        db_session.add_all(
+            [
+                OcrJob(
+                    original_filename=f"file{i}.pdf",
+                    file_type="pdf",
+                    total_pages=1,
+                )
+                for i in range(5)
+            ]
+        )
         await db_session.commit()
 
         jobs, total = await list_jobs(db_session, page=1, page_size=2)
         assert total == 5
         assert len(jobs) == 2
 
+        jobs, total = await list_jobs(db_session, page=4, page_size=2)
+        assert total == 5
+        assert jobs == []
+
     async def test_delete_job(self, db_session):
         job = await create_job(db_session, "test.pdf", "pdf", 1)
+        page_job = await create_page_job(db_session, job.id, 1, b"bytes")
         await db_session.commit()
 
         deleted = await delete_job(db_session, job.id)
@@ -58,6 +78,19 @@ class TestJobCRUD:
 
         fetched = await get_job(db_session, job.id)
         assert fetched is None
+        assert await get_page_jobs(db_session, job.id) == []
+        assert await get_page_image(db_session, page_job.id) is None
+
+    async def test_delete_job_keeps_shared_image(self, db_session):
+        job_a = await create_job(db_session, "a.png", "image", 1)
+        await create_page_job(db_session, job_a.id, 1, b"same_bytes")
+        job_b = await create_job(db_session, "b.png", "image", 1)
+        page_b = await create_page_job(db_session, job_b.id, 1, b"same_bytes")
+        await db_session.commit()
+
+        await delete_job(db_session, job_a.id)
+        await db_session.commit()
+        assert await get_page_image(db_session, page_b.id) == b"same_bytes"
 
 
 class TestPageJobCRUD:
@@ -73,43 +106,113 @@ class TestPageJobCRUD:
         pages = await get_page_jobs(db_session, job.id)
         assert len(pages) == 1
         assert pages[0].page_number == 1
-        assert pages[0].image_data == b"fake_image_bytes"
+        assert await get_page_image(db_session, page_job.id) == b"fake_image_bytes"
 
-    async def test_claim_page_job(self, db_session):
-        job = await create_job(db_session, "test.pdf", "pdf", 1)
+    @pytest.mark.fk
+    async def test_create_page_job_requires_parent(self, db_session):
+        with pytest.raises(IntegrityError):
+            await create_page_job(db_session, "missing-job", 1, b"bytes")
+
+    async def test_create_page_jobs(self, db_session):
+        job = await create_job(db_session, "test.pdf", "pdf", 3)
+        ids = await create_page_jobs(
+            db_session,
+            job.id,
+            [(1, b"page_one"), (2, b"blank"), (3, b"blank")],
+            media_type="image/jpeg",
+        )
         await db_session.commit()
-        page_job = await create_page_job(db_session, job.id, 1, b"bytes")
+
+        pages = await get_page_jobs(db_session, job.id)
+        assert [p.id for p in pages] == ids
+        assert [p.status for p in pages] == ["queued"] * 3
+        assert pages[1].image_sha == pages[2].image_sha
+        assert pages[0].created_at is not None
+        assert await get_page_image(db_session, ids[0]) == b"page_one"
+        image = await get_page_image_info(db_session, job.id, 3)
+        assert image.media_type == "image/jpeg"
+
+    async def test_create_page_jobs_sniff_media_type(self, db_session, png_bytes):
+        job = await create_job(db_session, "test.pdf", "pdf", 2)
+        await create_page_job(db_session, job.id, 1, png_bytes)
+        await create_page_jobs(db_session, job.id, [(2, b"\xff\xd8\xffjpeg")])
         await db_session.commit()
 
-        claimed = await claim_page_job(db_session, page_job.id, "worker-1")
+        png = await get_page_image_info(db_session, job.id, 1)
+        jpeg = await get_page_image_info(db_session, job.id, 2)
+        assert png.media_type == "image/png"
+        assert jpeg.media_type == "image/jpeg"
+
+    async def test_create_page_job_dedupes_images(self, db_session):
+        job = await create_job(db_session, "test.pdf", "pdf", 2)
+        page_1 = await create_page_job(db_session, job.id, 1, b"blank_page")
+        page_2 = await create_page_job(db_session, job.id, 2, b"blank_page")
         await db_session.commit()
-        assert claimed is True
 
-        # Try to claim again - should fail
-        claimed_again = await claim_page_job(db_session, page_job.id, "worker-2")
+        assert page_1.image_sha == page_2.image_sha
+        assert await get_page_image(db_session, page_2.id) == b"blank_page"
+
+    async def test_stream_page_image(self, db_session):
+        job = await create_job(db_session, "test.pdf", "pdf", 1)
+        await create_page_job(
+            db_session, job.id, 1, b"fake_image_bytes", media_type="image/jpeg"
+        )
         await db_session.commit()
-        assert claimed_again is False
 
-    async def test_get_next_queued_page(self, db_session):
+        image = await get_page_image_info(db_session, job.id, 1)
+        assert image is not None
+        assert image.media_type == "image/jpeg"
+        chunks = [
+            chunk
+            async for chunk in stream_page_image(db_session, image.rowid, 5)
+        ]
+        assert chunks == [b"fake_", b"image", b"_byte", b"s"]
+        assert await get_page_image_info(db_session, job.id, 2) is None
+
+    async def test_claim_next_queued_page(self, db_session):
         job = await create_job(db_session, "test.pdf", "pdf", 1)
         await db_session.commit()
-        await create_page_job(db_session, job.id, 1, b"bytes")
+        page_job = await create_page_job(db_session, job.id, 1, b"bytes")
+        await db_session.commit()
+
+        claimed = await claim_next_queued_page(db_session, "worker-1")
         await db_session.commit()
+        assert claimed is not None
+        assert claimed.id == page_job.id
+        assert claimed.page_number == 1
+        assert claimed.parent_job_id == job.id
 
-        next_page = await get_next_queued_page(db_session)
-        assert next_page is not None
-        assert next_page.status == "queued"
+        # Queue is now empty
+        assert await claim_next_queued_page(db_session, "worker-2") is None
 
-    async def test_check_and_update_parent_status_completed(self, db_session):
+    async def test_claim_next_queued_page_oldest_first(self, db_session):
         job = await create_job(db_session, "test.pdf", "pdf", 2)
+        first = await create_page_job(db_session, job.id, 1, b"page_one")
+        second = await create_page_job(db_session, job.id, 2, b"page_two")
         await db_session.commit()
 
-        p1 = await create_page_job(db_session, job.id, 1, b"bytes1")
-        p2 = await create_page_job(db_session, job.id, 2, b"bytes2")
+        claimed = [
+            await claim_next_queued_page(db_session, "worker-1"),
+            await claim_next_queued_page(db_session, "worker-2"),
+        ]
         await db_session.commit()
+        assert [row.id for row in claimed] == [first.id, second.id]
+
+        pages = await get_page_jobs(db_session, job.id)
+        assert [(p.status, p.worker_id) for p in pages] == [
+            ("processing", "worker-1"),
+            ("processing", "worker-2"),
+        ]
 
-        await update_page_job_result(db_session, p1.id, "text1", "completed")
-        await update_page_job_result(db_session, p2.id, "text2", "completed")
+    async def test_check_and_update_parent_status_completed(self, db_session):
+        job = await create_job(db_session, "test.pdf", "pdf", 2)
+        p1_id, p2_id = await create_page_jobs(
+            db_session, job.id, [(1, b"bytes1"), (2, b"bytes2")]
+        )
+        await db_session.commit()
+
+        await update_page_job_result(db_session, p1_id, "text1", "completed")
+        await update_page_job_result(db_session, p2_id, "text2", "completed")
         await check_and_update_parent_status(db_session, job.id)
         await db_session.commit()
 
@@ -118,27 +221,62 @@ class TestPageJobCRUD:
 
     async def test_check_and_update_parent_status_failed(self, db_session):
         job = await create_job(db_session, "test.pdf", "pdf", 2)
+        p1_id, p2_id = await create_page_jobs(
+            db_session, job.id, [(1, b"bytes1"), (2, b"bytes2")]
+        )
+        await db_session.commit()
+
+        await update_page_job_result(db_session, p1_id, "text1", "completed")
+        await update_page_job_result(
+            db_session, p2_id, None, "failed", "OCR error"
+        )
+        await check_and_update_parent_status(db_session, job.id)
         await db_session.commit()
 
+        updated_job = await get_job(db_session, job.id)
+        assert updated_job.status == "failed"
+
+    async def test_finalize_page_job(self, db_session):
+        job = await create_job(db_session, "test.pdf", "pdf", 2)
+        await db_session.commit()
         p1 = await create_page_job(db_session, job.id, 1, b"bytes1")
         p2 = await create_page_job(db_session, job.id, 2, b"bytes2")
         await db_session.commit()
 
-        await update_page_job_result(db_session, p1.id, "text1", "completed")
-        await update_page_job_result(
-            db_session, p2.id, None, "failed", "OCR error"
+        await finalize_page_job(db_session, p1.id, job.id, "text1", "completed")
+        await finalize_page_job(
+            db_session, p2.id, job.id, None, "failed", "OCR error"
         )
-        await check_and_update_parent_status(db_session, job.id)
         await db_session.commit()
 
+        pages = await get_page_jobs(db_session, job.id)
+        assert [p.status for p in pages] == ["completed", "failed"]
+        assert pages[0].markdown_text == "text1"
+        assert pages[1].error_message == "OCR error"
         updated_job = await get_job(db_session, job.id)
         assert updated_job.status == "failed"
 
-    async def test_queue_depth(self, db_session):
-        job = await create_job(db_session, "test.pdf", "pdf", 2)
+    async def test_get_page_status_counts(self, db_session):
+        job = await create_job(db_session, "test.pdf", "pdf", 3)
         await db_session.commit()
-        await create_page_job(db_session, job.id, 1, b"bytes1")
+        p1 = await create_page_job(db_session, job.id, 1, b"bytes1")
         await create_page_job(db_session, job.id, 2, b"bytes2")
+        await create_page_job(db_session, job.id, 3, b"bytes3")
+        await db_session.commit()
+        await update_page_job_result(
+            db_session, p1.id, None, "failed", "OCR error"
+        )
+        await db_session.commit()
+
+        counts = await get_page_status_counts(db_session, job.id)
+        assert counts == {"queued": 2, "failed": 1}
+        assert await get_page_status_counts(db_session, "missing") == {}
+
+    async def test_queue_depth(self, db_session):
+        job = await create_job(db_session, "test.pdf", "pdf", 2)
+        await create_page_jobs(
+            db_session, job.id, [(1, b"bytes1"), (2, b"bytes2")]
+        )
         await db_session.commit()
 
         depth = await get_queue_depth(db_session)
@@ -0,0 +1,195 @@
+import sqlite3
+
+import pytest_asyncio
+from sqlalchemy import inspect
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app import database
+from app.crud import (
+    create_job,
+    create_page_jobs,
+    get_page_image,
+    get_page_image_info,
+)
+
+# Schema written by the first release, before page images moved out of
+# ocr_page_jobs.
+BASELINE_SCHEMA = """
+CREATE TABLE ocr_jobs (
+    id VARCHAR NOT NULL,
+    original_filename VARCHAR NOT NULL,
+    file_type VARCHAR NOT NULL,
+    total_pages INTEGER NOT NULL,
+    status VARCHAR NOT NULL,
+    created_at DATETIME NOT NULL,
+    updated_at DATETIME NOT NULL,
+    PRIMARY KEY (id)
+);
+CREATE TABLE ocr_page_jobs (
+    id VARCHAR NOT NULL,
+    parent_job_id VARCHAR NOT NULL,
+    page_number INTEGER NOT NULL,
+    image_data BLOB NOT NULL,
+    markdown_text VARCHAR,
+    status VARCHAR NOT NULL,
+    worker_id VARCHAR,
+    error_message VARCHAR,
+    created_at DATETIME NOT NULL,
+    updated_at DATETIME NOT NULL,
+    PRIMARY KEY (id),
+    FOREIGN KEY(parent_job_id) REFERENCES ocr_jobs (id) ON DELETE CASCADE
+);
+"""
+
+# Page images in a sidecar table keyed by page job, without the blob store.
+SIDECAR_SCHEMA = """
+CREATE TABLE ocr_jobs (
+    id VARCHAR(32) NOT NULL,
+    original_filename VARCHAR NOT NULL,
+    file_type VARCHAR NOT NULL,
+    total_pages INTEGER NOT NULL,
+    status VARCHAR NOT NULL,
+    created_at DATETIME NOT NULL,
+    updated_at DATETIME NOT NULL,
+    PRIMARY KEY (id)
+);
+CREATE TABLE ocr_page_jobs (
+    id VARCHAR(32) NOT NULL,
+    parent_job_id VARCHAR NOT NULL,
+    page_number INTEGER NOT NULL,
+    markdown_text VARCHAR,
+    status VARCHAR NOT NULL,
+    worker_id VARCHAR,
+    error_message VARCHAR,
+    created_at DATETIME NOT NULL,
+    updated_at DATETIME NOT NULL,
+    PRIMARY KEY (id),
+    FOREIGN KEY(parent_job_id) REFERENCES ocr_jobs (id) ON DELETE CASCADE
+);
+CREATE TABLE ocr_page_images (
+    page_job_id VARCHAR NOT NULL,
+    image_data BLOB NOT NULL,
+    PRIMARY KEY (page_job_id),
+    FOREIGN KEY(page_job_id) REFERENCES ocr_page_jobs (id) ON DELETE CASCADE
+);
+"""
+
+JOB_ID = "0b7c1f2e-0000-4000-8000-000000000001"
+NOW = "2026-01-01 00:00:00.000000"
+
+
+@pytest_asyncio.fixture
+async def upgrade_engine(tmp_path, monkeypatch):
+    """Async engine on an empty file that init_db will run against."""
+    db_path = tmp_path / "old.sqlite"
+    engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}")
+    monkeypatch.setattr(database, "engine", engine)
+    yield db_path, engine
+    await engine.dispose()
+
+
+def _write_baseline_db(db_path, pages):
+    conn = sqlite3.connect(db_path)
+    conn.executescript(BASELINE_SCHEMA)
+    conn.execute(
+        "INSERT INTO ocr_jobs VALUES (?, 'doc.pdf', 'pdf', ?, 'queued', ?, ?)",
+        (JOB_ID, len(pages), NOW, NOW),
+    )
+    conn.executemany(
+        "INSERT INTO ocr_page_jobs VALUES "
+        "(?, ?, ?, ?, NULL, 'queued', NULL, NULL, ?, ?)",
+        [
+            (f"page-{number}", JOB_ID, number, data, NOW, NOW)
+            for number, data in pages
+        ],
+    )
+    conn.commit()
+    conn.close()
+
+
+def _write_sidecar_db(db_path, pages):
+    conn = sqlite3.connect(db_path)
+    conn.executescript(SIDECAR_SCHEMA)
+    conn.execute(
+        "INSERT INTO ocr_jobs VALUES (?, 'doc.pdf', 'pdf', ?, 'queued', ?, ?)",
+        (JOB_ID, len(pages), NOW, NOW),
+    )
+    for number, data in pages:
+        conn.execute(
+            "INSERT INTO ocr_page_jobs VALUES "
+            "(?, ?, ?, NULL, 'queued', NULL, NULL, ?, ?)",
+            (f"page-{number}", JOB_ID, number, NOW, NOW),
+        )
+        conn.execute(
+            "INSERT INTO ocr_page_images VALUES (?, ?)",
+            (f"page-{number}", data),
+        )
+    conn.commit()
+    conn.close()
+
+
+async def _page_job_columns(engine):
+    async with engine.connect() as conn:
+        return await conn.run_sync(
+            lambda sync_conn: {
+                col["name"]
+                for col in inspect(sync_conn).get_columns("ocr_page_jobs")
+            }
+        )
+
+
+class TestInitDbUpgrade:
+    async def test_moves_inline_images_to_blobs(self, upgrade_engine, png_bytes):
+        db_path, engine = upgrade_engine
+        _write_baseline_db(db_path, [(1, png_bytes), (2, png_bytes)])
+
+        await database.init_db()
+
+        assert "image_data" not in await _page_job_columns(engine)
+        async with async_sessionmaker(engine)() as db:
+            assert await get_page_image(db, "page-1") == png_bytes
+            assert await get_page_image(db, "page-2") == png_bytes
+            info = await get_page_image_info(db, JOB_ID, 2)
+            assert info.media_type == "image/png"
+
+    async def test_accepts_new_pages_after_upgrade(
+        self, upgrade_engine, png_bytes
+    ):
+        db_path, engine = upgrade_engine
+        _write_baseline_db(db_path, [(1, png_bytes)])
+
+        await database.init_db()
+
+        async with async_sessionmaker(engine)() as db:
+            job = await create_job(db, "new.png", "image", 1)
+            [page_id] = await create_page_jobs(db, job.id, [(1, b"new_image")])
+            await db.commit()
+            assert await get_page_image(db, page_id) == b"new_image"
+
+    async def test_moves_sidecar_images_to_blobs(
+        self, upgrade_engine, png_bytes
+    ):
+        db_path, engine = upgrade_engine
+        _write_sidecar_db(db_path, [(1, png_bytes), (2, b"\xff\xd8\xffjpeg")])
+
+        await database.init_db()
+
+        async with engine.connect() as conn:
+            has_sidecar = await conn.run_sync(
+                lambda sync_conn: inspect(sync_conn).has_table("ocr_page_images")
+            )
+        assert not has_sidecar
+        async with async_sessionmaker(engine)() as db:
+            assert await get_page_image(db, "page-1") == png_bytes
+            info = await get_page_image_info(db, JOB_ID, 2)
+            assert info.media_type == "image/jpeg"
+
+    async def test_second_run_is_a_no_op(self, upgrade_engine, png_bytes):
+        db_path, engine = upgrade_engine
+        _write_baseline_db(db_path, [(1, png_bytes)])
+
+        await database.init_db()
+        await database.init_db()
+
+        async with async_sessionmaker(engine)() as db:
+            assert await get_page_image(db, "page-1") == png_bytes
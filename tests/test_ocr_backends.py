@@ -0,0 +1,191 @@
+import asyncio
+import os
+import tempfile
+from pathlib import Path
+
+import pytest
+
+from app.ocr_backends import spaces
+from app.ocr_backends.base import OCRBackend
+from app.ocr_backends.huggingface import _TABLE_ROWS_RE, HuggingFaceBackend
+
+
+class CountingBackend(OCRBackend):
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+
+    async def _process_image_impl(self, image_bytes: bytes) -> str:
+        self.calls += 1
+        return f"text for {image_bytes!r}"
+
+
+class TestResultCache:
+    async def test_duplicate_images_skip_the_model(self):
+        backend = CountingBackend()
+
+        first = await backend.process_image(b"blank_page")
+        second = await backend.process_image(b"blank_page")
+        await backend.process_image(b"other_page")
+
+        assert first == second
+        assert backend.calls == 2
+
+
+TABLE_TEXT = "Totals:\n\n| Item | Qty |\n|------|-----|\n| Pen  | 2   |\n"
+TABLE_HTML = "<table><tr><td rowspan=\"2\">Pen</td></tr></table>"
+
+
+@pytest.mark.parametrize(
+    "text, has_table",
+    [
+        (TABLE_TEXT, True),
+        ("  | a | b |\n\t| 1 | 2 |", True),
+        ("Use a | b to pipe output.", False),
+        ("| just one row |", False),
+        ("```\ncat file | grep x\nls | wc -l\n```", False),
+    ],
+)
+def test_table_rows_re(text, has_table):
+    assert (_TABLE_ROWS_RE.search(text) is not None) is has_table
+
+
+class TestHuggingFaceAutoMode:
+    @pytest.fixture
+    def backend(self):
+        backend = HuggingFaceBackend(hf_token="", mode="auto")
+        yield backend
+        backend._pool.shutdown(wait=False)
+
+    @pytest.fixture
+    def speculative_backend(self):
+        backend = HuggingFaceBackend(
+            hf_token="", mode="auto", speculative_table=True
+        )
+        yield backend
+        backend._pool.shutdown(wait=False)
+
+    @staticmethod
+    def _stub_passes(monkeypatch, backend, text, table) -> list[str]:
+        """Replace the Space call; returns the list of tasks it was asked for."""
+        calls = []
+
+        async def fake_call_ocr(image, task):
+            calls.append(task)
+            result = text if task == "Text" else table
+            if isinstance(result, Exception):
+                raise result
+            return result
+
+        monkeypatch.setattr(backend, "_call_ocr", fake_call_ocr)
+        return calls
+
+    async def test_appends_table_html(self, backend, monkeypatch, png_bytes):
+        calls = self._stub_passes(monkeypatch, backend, TABLE_TEXT, TABLE_HTML)
+
+        result = await backend.process_image(png_bytes)
+
+        assert result.startswith(TABLE_TEXT)
+        assert result.endswith(TABLE_HTML)
+        assert calls == ["Text", "Table"]
+
+    async def test_skips_table_pass_without_table(
+        self, backend, monkeypatch, png_bytes
+    ):
+        calls = self._stub_passes(
+            monkeypatch, backend, "Plain a | b text", TABLE_HTML
+        )
+
+        assert await backend.process_image(png_bytes) == "Plain a | b text"
+        assert calls == ["Text"]
+
+    async def test_table_failure_falls_back_to_text(
+        self, backend, monkeypatch, png_bytes
+    ):
+        self._stub_passes(
+            monkeypatch, backend, TABLE_TEXT, RuntimeError("Space busy")
+        )
+
+        assert await backend.process_image(png_bytes) == TABLE_TEXT
+
+    async def test_table_failure_is_not_cached(
+        self, backend, monkeypatch, png_bytes
+    ):
+        self._stub_passes(
+            monkeypatch, backend, TABLE_TEXT, RuntimeError("Space busy")
+        )
+        assert await backend.process_image(png_bytes) == TABLE_TEXT
+
+        calls = self._stub_passes(monkeypatch, backend, TABLE_TEXT, TABLE_HTML)
+        result = await backend.process_image(png_bytes)
+
+        assert calls == ["Text", "Table"]
+        assert result.endswith(TABLE_HTML)
+
+    async def test_speculative_runs_both_passes(
+        self, speculative_backend, monkeypatch, png_bytes
+    ):
+        calls = self._stub_passes(
+            monkeypatch, speculative_backend, "Plain text", TABLE_HTML
+        )
+
+        assert await speculative_backend.process_image(png_bytes) == "Plain text"
+        assert sorted(calls) == ["Table", "Text"]
+
+    async def test_retry_reuses_successful_table_pass(
+        self, speculative_backend, monkeypatch, png_bytes
+    ):
+        real_sleep = asyncio.sleep
+        monkeypatch.setattr(asyncio, "sleep", lambda delay: real_sleep(0))
+        calls = []
+        text_results = [RuntimeError("Space busy"), TABLE_TEXT]
+
+        async def fake_call_ocr(image, task):
+            calls.append(task)
+            if task == "Table":
+                return TABLE_HTML
+            result = text_results.pop(0)
+            if isinstance(result, Exception):
+                raise result
+            return result
+
+        monkeypatch.setattr(speculative_backend, "_call_ocr", fake_call_ocr)
+
+        result = await speculative_backend.process_image(png_bytes)
+
+        assert result.endswith(TABLE_HTML)
+        assert sorted(calls) == ["Table", "Text", "Text"]
+
+    async def test_speculative_appends_table_html(
+        self, speculative_backend, monkeypatch, png_bytes
+    ):
+        self._stub_passes(monkeypatch, speculative_backend, TABLE_TEXT, TABLE_HTML)
+
+        result = await speculative_backend.process_image(png_bytes)
+
+        assert result.startswith(TABLE_TEXT)
+        assert result.endswith(TABLE_HTML)
+
+
+class TestStageImage:
+    def test_falls_back_when_staging_dir_fails(self, tmp_path, monkeypatch):
+        # A file where the directory should be makes mkstemp raise OSError.
+        not_a_dir = tmp_path / "shm"
+        not_a_dir.write_bytes(b"")
+        monkeypatch.setattr(spaces, "_STAGING_DIR", str(not_a_dir))
+
+        path = spaces.stage_image(b"\x89PNG\r\n\x1a\nrest")
+        try:
+            assert path.endswith(".png")
+            assert Path(path).read_bytes() == b"\x89PNG\r\n\x1a\nrest"
+        finally:
+            os.unlink(path)
+
+    def test_removes_partial_file_when_write_fails(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(spaces, "_STAGING_DIR", str(tmp_path))
+        monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+
+        with pytest.raises(TypeError):
+            spaces.stage_image("not bytes", suffix=".png")
+
+        assert list(tmp_path.iterdir()) == []
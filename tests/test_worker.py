@@ -1,39 +1,196 @@
 import asyncio
 
 import pytest
-from unittest.mock import AsyncMock, patch
 
+from app import crud
+from app.crud import create_job, create_page_job, get_page_status_counts
+from app.ocr_backends.base import OCRBackend, OCRProcessingError
 from app.worker import WorkerManager
 
 
+class _Stub(OCRBackend):
+    """OCR backend that returns fixed text and records what it was given."""
+
+    def __init__(self):
+        super().__init__()
+        self.images: list[bytes] = []
+        self.error: Exception | None = None
+
+    async def _process_image_impl(self, image_bytes: bytes) -> str:
+        self.images.append(image_bytes)
+        if self.error is not None:
+            raise self.error
+        return "# OCR Result\n\nTest text"
+
+
+class _GatedStub(_Stub):
+    """_Stub whose OCR calls block until their image is released."""
+
+    def __init__(self):
+        super().__init__()
+        self.started = asyncio.Condition()
+        self._gates: dict[bytes, asyncio.Event] = {}
+
+    def release(self, *images: bytes) -> None:
+        for image in images:
+            self._gates.setdefault(image, asyncio.Event()).set()
+
+    async def wait_started(self, count: int, timeout: float) -> None:
+        async with self.started:
+            await asyncio.wait_for(
+                self.started.wait_for(lambda: len(self.images) >= count),
+                timeout,
+            )
+
+    async def _process_image_impl(self, image_bytes: bytes) -> str:
+        async with self.started:
+            self.images.append(image_bytes)
+            self.started.notify_all()
+        await self._gates.setdefault(image_bytes, asyncio.Event()).wait()
+        return "# OCR Result\n\nTest text"
+
+
+class _PausingEvent(asyncio.Event):
+    """Event whose first wait() pauses until ``resume`` is set."""
+
+    def __init__(self):
+        super().__init__()
+        self.paused = asyncio.Event()
+        self.resume = asyncio.Event()
+
+    async def wait(self):
+        if not self.paused.is_set():
+            self.paused.set()
+            await self.resume.wait()
+        return await super().wait()
+
+
+class _FinalizeWatcher:
+    """Records page statuses as workers finalize them, under a Condition."""
+
+    def __init__(self):
+        self.cond = asyncio.Condition()
+        self.statuses: list[str] = []
+
+    async def wait_for(self, predicate, timeout: float = 5.0) -> None:
+        async with self.cond:
+            await asyncio.wait_for(self.cond.wait_for(predicate), timeout)
+
+
+@pytest.fixture
+def mocked_backend(monkeypatch) -> _Stub:
+    """Make WorkerManager.start() use a fresh _Stub as the OCR backend."""
+    stub = _Stub()
+    monkeypatch.setattr("app.worker.get_ocr_backend", lambda: stub)
+    return stub
+
+
+@pytest.fixture
+def worker_db(test_db_engine, monkeypatch) -> None:
+    """Point the workers' own sessions at the test database."""
+    _, TestSessionLocal = test_db_engine
+    monkeypatch.setattr("app.database.AsyncSessionLocal", TestSessionLocal)
+
+
+@pytest.fixture
+def finalized(monkeypatch) -> _FinalizeWatcher:
+    """Notify a Condition after every crud.finalize_page_job call."""
+    watcher = _FinalizeWatcher()
+    real_finalize = crud.finalize_page_job
+
+    async def finalize_and_notify(
+        db, page_job_id, parent_job_id, markdown_text, status, error_message=None
+    ):
+        await real_finalize(
+            db, page_job_id, parent_job_id, markdown_text, status, error_message
+        )
+        async with watcher.cond:
+            watcher.statuses.append(status)
+            watcher.cond.notify_all()
+
+    monkeypatch.setattr(crud, "finalize_page_job", finalize_and_notify)
+    return watcher
+
+
 class TestWorkerManager:
-    async def test_start_stop(self):
+    async def test_start_stop(self, mocked_backend):
         manager = WorkerManager()
         await manager.start(2)
         assert manager.worker_count == 2
         await manager.stop()
         assert manager.worker_count == 0
 
-    async def test_worker_processes_job(self, db_session):
+    async def test_worker_processes_job(
+        self, db_session, mocked_backend, worker_db, finalized
+    ):
         """Test that a worker picks up and processes a queued page job."""
-        from app.crud import create_job, create_page_job, get_page_jobs
-
         job = await create_job(db_session, "test.png", "image", 1)
+        await create_page_job(db_session, job.id, 1, b"fake_image")
         await db_session.commit()
+
+        manager = WorkerManager()
+        await manager.start(1)
+        await finalized.wait_for(lambda: finalized.statuses == ["completed"])
+        # stop() lets the worker commit the page it just finalized
+        await manager.stop()
+
+        assert manager.worker_count == 0
+        assert mocked_backend.images == [b"fake_image"]
+        counts = await get_page_status_counts(db_session, job.id)
+        assert counts == {"completed": 1}
+
+    async def test_worker_marks_failed_page(
+        self, db_session, mocked_backend, worker_db, finalized
+    ):
+        mocked_backend.error = OCRProcessingError("Space unavailable")
+        job = await create_job(db_session, "test.png", "image", 1)
         await create_page_job(db_session, job.id, 1, b"fake_image")
         await db_session.commit()
 
-        mock_backend = AsyncMock()
-        mock_backend.process_image = AsyncMock(
-            return_value="# OCR Result\n\nTest text"
-        )
+        manager = WorkerManager()
+        await manager.start(1)
+        await finalized.wait_for(lambda: finalized.statuses == ["failed"])
+        await manager.stop()
+
+        await db_session.refresh(job)
+        assert job.status == "failed"
+        counts = await get_page_status_counts(db_session, job.id)
+        assert counts == {"failed": 1}
+
+    async def test_idle_worker_wakes_after_busy_worker_clears(
+        self, db_session, worker_db, monkeypatch
+    ):
+        """A notify cleared by a busy worker still reaches the idle one."""
+        stub = _GatedStub()
+        monkeypatch.setattr("app.worker.get_ocr_backend", lambda: stub)
+        first = await create_job(db_session, "first.png", "image", 1)
+        await create_page_job(db_session, first.id, 1, b"page_0")
+        await db_session.commit()
 
         manager = WorkerManager()
+        manager._work_available = _PausingEvent()
+        await manager.start(2)
+        try:
+            # One worker is busy with page_0; the other found the queue
+            # empty and is held just before it waits for work.
+            await stub.wait_started(1, timeout=5.0)
+            await asyncio.wait_for(manager._work_available.paused.wait(), 5.0)
 
-        with patch("app.worker.get_ocr_backend", return_value=mock_backend):
-            await manager.start(1)
-            await asyncio.sleep(2.5)  # Let worker process
-            await manager.stop()
+            job = await create_job(db_session, "second.pdf", "pdf", 2)
+            await create_page_job(db_session, job.id, 1, b"page_1")
+            await create_page_job(db_session, job.id, 2, b"page_2")
+            await db_session.commit()
+            manager.notify_new_work()
 
-        # Worker uses its own DB session, so we verify it stopped cleanly
-        assert manager.worker_count == 0
+            # The busy worker clears the notify and claims one new page.
+            stub.release(b"page_0")
+            await stub.wait_started(2, timeout=5.0)
+
+            # The idle worker must take the other page well inside the
+            # 5 s safety-net timeout.
+            manager._work_available.resume.set()
+            await stub.wait_started(3, timeout=2.0)
+            assert set(stub.images[1:]) == {b"page_1", b"page_2"}
+        finally:
+            stub.release(b"page_0", b"page_1", b"page_2")
+            await manager.stop()